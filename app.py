@@ -2,22 +2,63 @@
 import os
 import sqlite3
 import csv
-from io import StringIO
+import json
+import queue
+import threading
+import bisect
+import heapq
+import hashlib
+import gzip
+import zlib
+import shutil
+import tempfile
+import re
+import socket
+import contextvars
+import functools
+from contextlib import contextmanager
+from collections import OrderedDict
+import time as _time
+from io import StringIO, TextIOWrapper
 from datetime import datetime, date, time, timedelta
 from dateutil import parser as dtparser
 import pytz
 
-from flask import Flask, render_template, request, redirect, session, url_for, send_file, jsonify, make_response
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, Response, render_template, request, redirect, session, url_for, send_file, jsonify, make_response, abort, g, has_request_context
+from flask.sessions import SessionInterface, SecureCookieSession
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 import secrets, string
+import click
 from pathlib import Path
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "change_me_please")
 
 DB_PATH = os.environ.get("DB_PATH", "picks.db")
+LEAGUES_DIR = os.environ.get("LEAGUES_DIR", "leagues")
 DRIVERS_CSV = "nascar_2025_driver_names.csv"
 ROUNDS_TOTAL = 6
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_KB = int(os.environ.get("DB_CACHE_KB", "8192"))
+PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", "256"))
+STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", "0.5"))
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_MAX_PER_WORKER = int(os.environ.get("STREAM_MAX_PER_WORKER", "4"))
+DRAFT_STREAM_ORIGIN = os.environ.get("DRAFT_STREAM_ORIGIN", "").rstrip("/")
+CLOCK_RESCAN_SECONDS = 30
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+USER_CACHE_SECONDS = float(os.environ.get("USER_CACHE_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "4096"))
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", "2"))
+PASSWORD_HASH_WAIT_SECONDS = float(os.environ.get("PASSWORD_HASH_WAIT_SECONDS", "5"))
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "backups")
+BACKUP_INTERVAL_SECONDS = int(os.environ.get("BACKUP_INTERVAL_SECONDS", "0"))
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", "24"))
+BACKUP_PAGES_PER_STEP = int(os.environ.get("BACKUP_PAGES_PER_STEP", "256"))
+DRAFT_SNAPSHOT_EVERY = int(os.environ.get("DRAFT_SNAPSHOT_EVERY", "16"))
 
 def tz():
     tzname = os.environ.get("APP_TZ", "America/Chicago")
@@ -26,15 +67,600 @@ def tz():
     except Exception:
         return pytz.timezone("America/Chicago")
 
+# SQL run while serving a request; set by the request hooks, None elsewhere.
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+
+class RequestSQL:
+    def __init__(self, keep_statements):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if keep_statements else None
+
+    def add(self, sql, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None and len(self.statements) < 50:
+            self.statements.append((seconds, " ".join(sql.split())))
+
+def timed_sql(method):
+    # Times the statement up to its first row; later fetches aren't counted.
+    def run(self, sql, *args):
+        stats = _request_sql.get()
+        if stats is None:
+            return method(self, sql, *args)
+        start = _time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            stats.add(sql, _time.perf_counter() - start)
+    return run
+
+class TimedCursor(sqlite3.Cursor):
+    execute = timed_sql(sqlite3.Cursor.execute)
+    executemany = timed_sql(sqlite3.Cursor.executemany)
+
+class PooledConnection(sqlite3.Connection):
+    """A sqlite3 connection whose close() hands it back to its pool.
+
+    Its cursors count and time every statement run during a request.
+    """
+    pool = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+    def stream_cursor(self):
+        # SQLite already steps through a result as it is fetched.
+        return self.cursor()
+
+    def close(self):
+        if self.pool is None:
+            return super().close()
+        self.pool.release(self)
+
+    def discard(self):
+        super().close()
+
+class ConnectionPool:
+    """Keeps a few open connections to one league's database for reuse.
+
+    Every helper opens and closes a connection per call, so reusing them saves
+    the connect and the session setup on each call.
+    """
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.idle = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.stats = {"opened":0, "reused":0, "discarded":0, "in_use":0}
+
+    def acquire(self):
+        conn = None
+        with self.lock:
+            if self.pid != os.getpid():
+                # Never share sqlite handles with a forked parent.
+                self.idle = []; self.pid = os.getpid(); self.stats["in_use"] = 0
+            if self.idle:
+                conn = self.idle.pop(); self.stats["reused"] += 1
+            else:
+                self.stats["opened"] += 1
+            self.stats["in_use"] += 1
+        if conn is None:
+            try:
+                conn = self.connect()
+            except Exception:
+                with self.lock: self.stats["in_use"] -= 1
+                raise
+        return conn
+
+    def connect(self):
+        conn = storage.connect(self.path)
+        conn.pool = self
+        return conn
+
+    def release(self, conn):
+        keep = True
+        try:
+            # Match plain close(): anything left uncommitted is thrown away.
+            if conn.in_transaction: conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            keep = False
+        with self.lock:
+            self.stats["in_use"] -= 1
+            if keep and self.pid == os.getpid() and len(self.idle) < self.size:
+                self.idle.append(conn)
+                return
+            self.stats["discarded"] += 1
+        conn.discard()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, idle=len(self.idle), size=self.size)
+
+# --- storage backends ---
+# Helpers write plain SQL with '?' placeholders against a connection from
+# get_conn(); the backend decides where that connection goes. Unset
+# DATABASE_URL keeps one SQLite file per league on this host. A
+# postgresql:// URL keeps every league in one shared server database, one
+# schema per league, so several app hosts can serve the same draft.
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+
+try:
+    import psycopg
+    from psycopg.pq import TransactionStatus
+    from psycopg.types.numeric import FloatLoader
+except ImportError:  # only needed with a postgresql:// DATABASE_URL
+    psycopg = None
+
+class SQLiteStorage:
+    """DB_PATH plus one SQLite file per league under LEAGUES_DIR.
+
+    Connections are opened in WAL mode so that the many readers polling
+    draft state never block the writer recording a pick.
+    """
+    backups = True
+
+    def connect(self, path):
+        conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS/1000, check_same_thread=False, factory=PooledConnection)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_KB}")
+        return conn
+
+    def watch_connection(self, path):
+        # Outside the pool: data_version only moves for commits made through
+        # other connections, which includes this worker's own pool.
+        return sqlite3.connect(path, check_same_thread=False)
+
+    def change_token(self, conn):
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def leagues(self):
+        if not os.path.isdir(LEAGUES_DIR): return []
+        return [f[:-3] for f in os.listdir(LEAGUES_DIR) if f.endswith(".db")]
+
+    def begin_write(self, c):
+        c.execute("BEGIN IMMEDIATE")
+
+    def create_schema(self, c):
+        create_base_schema(c)
+        return run_migrations(c)
+
+    def explain(self, c, sql, params):
+        c.execute("EXPLAIN QUERY PLAN " + sql, params)
+        detail = [r[3] for r in c.fetchall()]
+        return detail, any(d.startswith("SCAN") and "USING" not in d for d in detail)
+
+@functools.lru_cache(maxsize=512)
+def pg_sql(sql):
+    return sql.replace("%", "%%").replace("?", "%s")
+
+@contextmanager
+def pg_errors():
+    # Callers catch sqlite3's exception types whichever backend is in use.
+    try:
+        yield
+    except psycopg.IntegrityError as e:
+        raise sqlite3.IntegrityError(str(e)) from e
+    except psycopg.Error as e:
+        raise sqlite3.OperationalError(str(e)) from e
+
+class PgCursor:
+    """A psycopg cursor that takes this module's sqlite-style SQL.
+
+    A named cursor is a server-side one: fetchmany() pulls each batch from
+    the server instead of the whole result arriving at execute().
+    """
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.cur = connection.raw.cursor(name=name) if name else connection.raw.cursor()
+
+    def _execute(self, sql, params=()):
+        with pg_errors():
+            if params: self.cur.execute(pg_sql(sql), params)
+            else: self.cur.execute(sql)
+        return self
+
+    def _executemany(self, sql, seq):
+        with pg_errors():
+            self.cur.executemany(pg_sql(sql), seq)
+        return self
+
+    execute = timed_sql(_execute)
+    executemany = timed_sql(_executemany)
+
+    @property
+    def rowcount(self):
+        return self.cur.rowcount
+
+    @property
+    def description(self):
+        return self.cur.description
+
+    def fetchone(self):
+        with pg_errors(): return self.cur.fetchone()
+
+    def fetchmany(self, size):
+        with pg_errors(): return self.cur.fetchmany(size)
+
+    def fetchall(self):
+        with pg_errors(): return self.cur.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self.cur.close()
+
+class PgConnection:
+    """A psycopg connection with the sqlite3.Connection surface used here.
+
+    Like PooledConnection, close() hands it back to its pool.
+    """
+    def __init__(self, raw, schema):
+        self.raw = raw
+        self.schema = schema
+        self.pool = None
+        self.row_factory = None
+
+    def cursor(self):
+        return PgCursor(self)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+    def stream_cursor(self):
+        # Closed by the rollback when the connection goes back to its pool.
+        return PgCursor(self, "stream_" + secrets.token_hex(8))
+
+    @property
+    def in_transaction(self):
+        return self.raw.info.transaction_status != TransactionStatus.IDLE
+
+    def commit(self):
+        with pg_errors(): self.raw.commit()
+
+    def rollback(self):
+        with pg_errors(): self.raw.rollback()
+
+    def close(self):
+        if self.pool is None:
+            return self.discard()
+        self.pool.release(self)
+
+    def discard(self):
+        self.raw.close()
+
+class PostgresStorage:
+    """Every league in one PostgreSQL database: schema "league" for DB_PATH
+    and "league_<name>" for each league.
+
+    A league's connections set search_path to its schema, so the same SQL
+    runs unchanged. BEGIN IMMEDIATE becomes a transaction-scoped advisory
+    lock on the schema name, which serializes pick transactions per league
+    across every host. Snapshots are left to pg_dump.
+    """
+    backups = False
+
+    def __init__(self, url):
+        if psycopg is None:
+            raise RuntimeError("DATABASE_URL needs the psycopg package (pip install psycopg).")
+        self.url = url
+        self.known = set()
+
+    def schema(self, path):
+        if os.path.abspath(path) == os.path.abspath(DB_PATH): return "league"
+        return "league_" + Path(path).stem
+
+    def connect(self, path, autocommit=False):
+        schema = self.schema(path)
+        with pg_errors():
+            raw = psycopg.connect(self.url, autocommit=autocommit)
+            raw.adapters.register_loader("numeric", FloatLoader)
+            raw.execute(f'SET search_path TO "{schema}"')
+            if not autocommit: raw.commit()
+        return PgConnection(raw, schema)
+
+    def watch_connection(self, path):
+        return self.connect(path, autocommit=True)
+
+    def change_token(self, conn):
+        return conn.execute("SELECT SUM(version) FROM data_versions WHERE name IN ('drafts', 'draft_picks')").fetchone()[0]
+
+    def exists(self, path):
+        # Leagues are never dropped, so a schema seen once is remembered.
+        if path in self.known: return True
+        conn=get_pool(DB_PATH).acquire(); c=conn.cursor()
+        c.execute("SELECT 1 FROM information_schema.schemata WHERE schema_name=?", (self.schema(path),))
+        found = c.fetchone() is not None; conn.close()
+        if found: self.known.add(path)
+        return found
+
+    def leagues(self):
+        conn=get_pool(DB_PATH).acquire(); c=conn.cursor()
+        c.execute("SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE 'league\\_%'")
+        names=[r[0][len("league_"):] for r in c.fetchall()]; conn.close()
+        return names
+
+    def begin_write(self, c):
+        c.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (c.connection.schema,))
+
+    def create_schema(self, c):
+        c.execute(f'CREATE SCHEMA IF NOT EXISTS "{c.connection.schema}"')
+        for sql in PG_SCHEMA:
+            c.execute(sql)
+        for table in PG_TRACKED_TABLES:
+            c.execute("INSERT INTO data_versions (name, version) VALUES (?, 0) ON CONFLICT DO NOTHING", (table,))
+            c.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}")
+            c.execute(f"""CREATE TRIGGER trg_{table}_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+                          FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('{table}')""")
+        c.execute("SELECT version FROM schema_version")
+        done = {r[0] for r in c.fetchall()}
+        applied = [(v, name) for v, name, _ in MIGRATIONS if v not in done]
+        for v, _ in applied:
+            if v in PG_DATA_MIGRATIONS: PG_DATA_MIGRATIONS[v](c)
+        c.executemany("INSERT INTO schema_version (version, name) VALUES (?,?)", applied)
+        return [v for v, _ in applied]
+
+    def explain(self, c, sql, params):
+        c.execute("EXPLAIN " + sql, params)
+        detail = [r[0] for r in c.fetchall()]
+        return detail, any("Seq Scan" in d for d in detail)
+
+if DATABASE_URL.startswith(("postgres://", "postgresql://")):
+    storage = PostgresStorage(DATABASE_URL)
+elif DATABASE_URL:
+    raise RuntimeError("DATABASE_URL must be a postgresql:// URL; leave it unset for SQLite.")
+else:
+    storage = SQLiteStorage()
+
+def begin_write(c):
+    # Take the league's write lock before reading what the write depends on.
+    storage.begin_write(c)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# The database of the league being served; DB_PATH outside a league.
+_current_db = contextvars.ContextVar("current_db", default=None)
+
+def db_path():
+    return _current_db.get() or DB_PATH
+
+@contextmanager
+def use_db(path):
+    token = _current_db.set(path)
+    try:
+        yield path
+    finally:
+        _current_db.reset(token)
+
+def get_pool(path=None):
+    path = path or db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path, DB_POOL_SIZE))
+    return pool
+
 def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    return get_pool().acquire()
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {p.path: p.snapshot() for p in pools}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def prom_labels(**labels):
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92)*2).replace(chr(34), chr(92)+chr(34))}"' for k, v in labels.items()) + "}"
+
+class Metrics:
+    """Request, SQL, function and cache counters for /metrics.
+
+    Counters live in each worker process, so every series carries a worker
+    label and totals are summed at query time.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}      # (route, method) -> [bucket counts..., sum, count]
+        self.requests = {}     # (route, method, status) -> count
+        self.sql = {}          # route -> [queries, seconds]
+        self.functions = {}    # name -> [bucket counts..., sum, count]
+        self.caches = {}       # name -> [hits, misses]
+        self.slow = 0
+
+    def _observe(self, table, key, seconds):
+        h = table.get(key)
+        if h is None:
+            h = table[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        i = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if i < len(LATENCY_BUCKETS): h[i] += 1
+        h[-2] += seconds; h[-1] += 1
+
+    def request(self, route, method, status, seconds, sql):
+        with self.lock:
+            self._observe(self.latency, (route, method), seconds)
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            q = self.sql.setdefault(route, [0, 0.0])
+            q[0] += sql.count; q[1] += sql.seconds
+
+    def function(self, name, seconds):
+        with self.lock:
+            self._observe(self.functions, name, seconds)
+
+    def cache(self, name, hit):
+        with self.lock:
+            c = self.caches.setdefault(name, [0, 0])
+            c[0 if hit else 1] += 1
+
+    def _histogram(self, lines, metric, table, label):
+        for key, h in sorted(table.items()):
+            labels = dict(zip(label, key if isinstance(key, tuple) else (key,)), worker=os.getpid())
+            total = 0
+            for bound, n in zip(LATENCY_BUCKETS, h):
+                total += n
+                lines.append(f"{metric}_bucket{prom_labels(**labels, le=bound)} {total}")
+            lines.append(f"{metric}_bucket{prom_labels(**labels, le='+Inf')} {h[-1]}")
+            lines.append(f"{metric}_sum{prom_labels(**labels)} {h[-2]:.6f}")
+            lines.append(f"{metric}_count{prom_labels(**labels)} {h[-1]}")
+
+    def render(self, extra_caches=()):
+        w = os.getpid()
+        with self.lock:
+            lines = ["# HELP picks_request_duration_seconds Time to produce a response, by route.",
+                     "# TYPE picks_request_duration_seconds histogram"]
+            self._histogram(lines, "picks_request_duration_seconds", self.latency, ("route", "method"))
+            lines += ["# HELP picks_requests_total Responses sent, by route and status.", "# TYPE picks_requests_total counter"]
+            lines += [f"picks_requests_total{prom_labels(route=r, method=m, status=st, worker=w)} {n}"
+                      for (r, m, st), n in sorted(self.requests.items())]
+            lines += ["# HELP picks_sqlite_queries_total SQLite statements run while serving each route.",
+                      "# TYPE picks_sqlite_queries_total counter"]
+            lines += [f"picks_sqlite_queries_total{prom_labels(route=r, worker=w)} {q[0]}" for r, q in sorted(self.sql.items())]
+            lines += ["# HELP picks_sqlite_query_seconds_total Time spent in SQLite statements, by route.",
+                      "# TYPE picks_sqlite_query_seconds_total counter"]
+            lines += [f"picks_sqlite_query_seconds_total{prom_labels(route=r, worker=w)} {q[1]:.6f}" for r, q in sorted(self.sql.items())]
+            lines += ["# HELP picks_function_duration_seconds Time spent in instrumented helpers.",
+                      "# TYPE picks_function_duration_seconds histogram"]
+            self._histogram(lines, "picks_function_duration_seconds", self.functions, ("function",))
+            lines += ["# HELP picks_cache_requests_total Cache lookups, by cache and result.", "# TYPE picks_cache_requests_total counter"]
+            for name, (hits, misses) in sorted(list(self.caches.items()) + list(extra_caches)):
+                lines.append(f"picks_cache_requests_total{prom_labels(cache=name, result='hit', worker=w)} {hits}")
+                lines.append(f"picks_cache_requests_total{prom_labels(cache=name, result='miss', worker=w)} {misses}")
+            lines += ["# HELP picks_slow_requests_total Requests slower than SLOW_REQUEST_MS.", "# TYPE picks_slow_requests_total counter",
+                      f"picks_slow_requests_total{prom_labels(worker=w)} {self.slow}"]
+        return lines
+
+metrics = Metrics()
+
+def timed(name):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            start = _time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.function(name, _time.perf_counter() - start)
+        return run
+    return wrap
+
+def get_data_version(name):
+    conn=get_conn(); c=conn.cursor()
+    c.execute("SELECT version FROM data_versions WHERE name=?", (name,))
+    r=c.fetchone(); conn.close()
+    return r[0] if r else 0
+
+def get_data_versions(names):
+    conn=get_conn(); c=conn.cursor()
+    c.execute(f"SELECT name, version FROM data_versions WHERE name IN ({','.join('?'*len(names))})", names)
+    found=dict(c.fetchall()); conn.close()
+    return tuple(found.get(n, 0) for n in names)
+
+def track_table(c, table):
+    # Triggers bump data_versions[table] on every write, so any worker can
+    # tell that its cached copy of the table is stale with one lookup.
+    c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (table,))
+    for event in ["INSERT", "UPDATE", "DELETE"]:
+        c.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+                      BEGIN UPDATE data_versions SET version=version+1 WHERE name='{table}'; END""")
 
 def table_has_column(cur, table, col):
     cur.execute(f"PRAGMA table_info({table})")
     return any(row[1].lower() == col.lower() for row in cur.fetchall())
 
-def init_db():
-    conn = get_conn(); c = conn.cursor()
+def clean(row, key):
+    return (row.get(key) or "").strip()
+
+def schedule_row(row):
+    week = clean(row, "week")
+    name = clean(row, "race_name")
+    if not week.isdigit() or int(week) < 1:
+        raise ValueError(f"invalid week {week!r}")
+    if not name:
+        raise ValueError("missing race_name")
+    return (int(week), name, clean(row, "race_date") or None, clean(row, "tv_network") or None, clean(row, "start_time") or None)
+
+def qualifying_row(row):
+    pos = clean(row, "position")
+    driver = clean(row, "driver")
+    if not pos.isdigit() or int(pos) < 1:
+        raise ValueError(f"invalid position {pos!r}")
+    if not driver:
+        raise ValueError("missing driver")
+    return (int(pos), driver)
+
+def finish_points(position):
+    # Cup Series finishing points: 40 for the win, then 35, 34, ... down to 1.
+    return 40 if position == 1 else max(1, 37 - position)
+
+def results_row(row):
+    pos, driver = qualifying_row(row)
+    pts = clean(row, "points")
+    if pts and not pts.lstrip("-").isdigit():
+        raise ValueError(f"invalid points {pts!r}")
+    return (pos, driver, int(pts) if pts else finish_points(pos))
+
+def bulk_import(c, source, required, parse_row, sql, extra=()):
+    """Stream CSV rows from `source` through `parse_row` into one executemany.
+
+    Rows are parsed and validated as they are read, so an uploaded file is
+    never held in memory. Returns (count, errors) where errors is a list of
+    (line number, message); the caller decides whether to commit.
+    """
+    reader = csv.DictReader(source)
+    missing = [h for h in required if h not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    errors = []
+    count = 0
+    def rows():
+        nonlocal count
+        for row in reader:
+            if not any((v or "").strip() for v in row.values() if isinstance(v, str)):
+                continue
+            try:
+                values = parse_row(row)
+            except ValueError as e:
+                errors.append((reader.line_num, str(e)))
+                continue
+            count += 1
+            yield tuple(extra) + values
+    c.executemany(sql, rows())
+    return count, errors
+
+def csv_upload(text_field="csv_text", file_field="csv_file"):
+    """The uploaded CSV file as a text stream, else the pasted text, else None."""
+    f = request.files.get(file_field)
+    if f and f.filename:
+        return TextIOWrapper(f.stream, encoding="utf-8-sig", newline="")
+    text = request.form.get(text_field,"").strip()
+    return StringIO(text) if text else None
+
+def driver_names(f):
+    reader = csv.reader(f)
+    next(reader, None)
+    for row in reader:
+        if row and row[0].strip():
+            yield (row[0].strip(),)
+
+def create_base_schema(c):
     c.execute("""CREATE TABLE IF NOT EXISTS picks (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT NOT NULL,
@@ -81,28 +707,688 @@ def init_db():
     c.execute("""CREATE TABLE IF NOT EXISTS drivers (
         name TEXT PRIMARY KEY
     )""")
-    conn.commit()
-    try:
-        if Path(DRIVERS_CSV).exists():
-            with open(DRIVERS_CSV, newline='') as f:
-                reader = csv.reader(f)
-                header = next(reader, None)
-                for row in reader:
-                    if not row: continue
-                    name = row[0].strip()
-                    if not name: continue
-                    c.execute("INSERT OR IGNORE INTO drivers (name) VALUES (?)", (name,))
-            conn.commit()
-    except Exception:
-        pass
+    c.execute("""CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""")
+    c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('drafts', 0)")
+    for col in ["version", "base_version"]:
+        if not table_has_column(c, "drafts", col):
+            c.execute(f"ALTER TABLE drafts ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+    if not table_has_column(c, "draft_picks", "version"):
+        c.execute("ALTER TABLE draft_picks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+def seed_drivers(c):
+    if Path(DRIVERS_CSV).exists():
+        with open(DRIVERS_CSV, newline='') as f:
+            c.executemany("INSERT INTO drivers (name) VALUES (?) ON CONFLICT DO NOTHING", driver_names(f))
+
+def seed_users(c):
     c.execute("SELECT COUNT(*) FROM users")
     if c.fetchone()[0] == 0:
         for uname, admin in [("Matt",1),("Mark",0),("Bob",0),("Bill",0)]:
             c.execute("INSERT INTO users (username, is_admin, must_change_pw) VALUES (?,?,1)", (uname, admin))
+
+def migrate_draft_indexes(c):
+    # The pick path used to be racy, so a driver could be drafted twice in a
+    # week; keep the earliest pick so the unique index can be built.
+    c.execute("DELETE FROM draft_picks WHERE id NOT IN (SELECT MIN(id) FROM draft_picks GROUP BY week, driver)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_draft_picks_week_round ON draft_picks (week, round)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_draft_picks_week_username ON draft_picks (week, username)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_draft_picks_week_driver ON draft_picks (week, driver)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_picks_week_username ON picks (week, username)")
+
+def migrate_draft_clock(c):
+    if not table_has_column(c, "drafts", "pick_seconds"):
+        c.execute("ALTER TABLE drafts ADD COLUMN pick_seconds INTEGER NOT NULL DEFAULT 0")
+    if not table_has_column(c, "drafts", "clock_deadline"):
+        c.execute("ALTER TABLE drafts ADD COLUMN clock_deadline REAL")
+    if not table_has_column(c, "draft_picks", "auto"):
+        c.execute("ALTER TABLE draft_picks ADD COLUMN auto INTEGER NOT NULL DEFAULT 0")
+
+def migrate_pick_queues(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS pick_queues (
+        week INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        driver TEXT NOT NULL,
+        PRIMARY KEY (week, username, position)
+    )""")
+
+def migrate_sessions(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS sessions (
+        sid_hash TEXT PRIMARY KEY,
+        username TEXT,
+        data TEXT NOT NULL,
+        expires REAL NOT NULL
+    )""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions (username)")
+
+def migrate_scoring(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS results (
+        week INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        driver TEXT NOT NULL,
+        points INTEGER NOT NULL,
+        PRIMARY KEY (week, position)
+    )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS week_scores (
+        week INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        points INTEGER NOT NULL,
+        PRIMARY KEY (week, username)
+    )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS standings (
+        username TEXT PRIMARY KEY,
+        points INTEGER NOT NULL DEFAULT 0,
+        weeks INTEGER NOT NULL DEFAULT 0
+    )""")
+    track_table(c, "standings")
+
+def migrate_draft_events(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS draft_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        week INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        round INTEGER, username TEXT, driver TEXT,
+        data TEXT,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_draft_events_week ON draft_events (week, id)")
+    c.execute("""CREATE TABLE IF NOT EXISTS draft_snapshots (
+        week INTEGER NOT NULL,
+        event_id INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (week, event_id)
+    )""")
+    backfill_draft_events(c)
+
+def backfill_draft_events(c):
+    # Drafts started before the log existed get a created event followed by
+    # their picks so far, so every draft can be replayed.
+    c.execute("SELECT week, order_csv, rounds_total, pick_seconds, base_version FROM drafts WHERE week NOT IN (SELECT week FROM draft_events)")
+    for week, order_csv, rounds_total, pick_seconds, base_version in c.fetchall():
+        c.execute("INSERT INTO draft_events (week, version, kind, data) VALUES (?,?,'created',?)",
+                  (week, base_version, json.dumps({"order":order_csv.split(","), "rounds_total":rounds_total, "pick_seconds":pick_seconds})))
+        c.execute("SELECT round, username, driver, auto, version, ts FROM draft_picks WHERE week=? ORDER BY id", (week,))
+        c.executemany("INSERT INTO draft_events (week, version, kind, round, username, driver, data, ts) VALUES (?,?,?,?,?,?,?,?)",
+                      [(week, v, "auto_picked" if auto else "picked", r, u, dr, json.dumps({"auto":auto}) if auto else None, ts)
+                       for r, u, dr, auto, v, ts in c.fetchall()])
+        snapshot_draft(c, week)
+
+# (version, name, function). Append only; every step must be safe to re-run.
+# A new step also needs its PostgreSQL form in PG_SCHEMA below.
+MIGRATIONS = [
+    (1, "draft_picks and picks indexes", migrate_draft_indexes),
+    (2, "track schedule changes", lambda c: track_table(c, "schedule")),
+    (3, "track drivers changes", lambda c: track_table(c, "drivers")),
+    (4, "track qualifying and picks changes", lambda c: (track_table(c, "qualifying"), track_table(c, "picks"))),
+    (5, "draft pick clock", migrate_draft_clock),
+    (6, "pick queues", migrate_pick_queues),
+    (7, "race results and standings", migrate_scoring),
+    (8, "track draft picks", lambda c: track_table(c, "draft_picks")),
+    (9, "server-side sessions", migrate_sessions),
+    (10, "draft event log", migrate_draft_events),
+]
+
+# The PostgreSQL schema at LATEST_SCHEMA; every statement is safe to re-run.
+PG_TIMESTAMP = "to_char(timezone('utc', now()), 'YYYY-MM-DD HH24:MI:SS')"
+PG_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS picks (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        username TEXT NOT NULL,
+        week INTEGER NOT NULL,
+        driver1 TEXT NOT NULL, driver2 TEXT NOT NULL, driver3 TEXT NOT NULL,
+        driver4 TEXT NOT NULL, driver5 TEXT NOT NULL, driver6 TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS drafts (
+        week INTEGER PRIMARY KEY,
+        order_csv TEXT NOT NULL,
+        current_round INTEGER NOT NULL,
+        current_index INTEGER NOT NULL,
+        rounds_total INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        base_version INTEGER NOT NULL DEFAULT 0,
+        pick_seconds INTEGER NOT NULL DEFAULT 0,
+        clock_deadline DOUBLE PRECISION
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS draft_picks (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        week INTEGER NOT NULL, round INTEGER NOT NULL,
+        username TEXT NOT NULL, driver TEXT NOT NULL,
+        ts TEXT DEFAULT {PG_TIMESTAMP},
+        version INTEGER NOT NULL DEFAULT 0,
+        auto INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password_hash TEXT,
+        is_admin INTEGER NOT NULL DEFAULT 0,
+        must_change_pw INTEGER NOT NULL DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS schedule (
+        week INTEGER PRIMARY KEY,
+        race_name TEXT NOT NULL,
+        race_date TEXT,
+        tv_network TEXT,
+        start_time TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS qualifying (
+        week INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        driver TEXT NOT NULL,
+        PRIMARY KEY (week, position)
+    )""",
+    "CREATE TABLE IF NOT EXISTS drivers (name TEXT PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)",
+    "INSERT INTO data_versions (name, version) VALUES ('drafts', 0) ON CONFLICT DO NOTHING",
+    """CREATE TABLE IF NOT EXISTS pick_queues (
+        week INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        driver TEXT NOT NULL,
+        PRIMARY KEY (week, username, position)
+    )""",
+    """CREATE TABLE IF NOT EXISTS results (
+        week INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        driver TEXT NOT NULL,
+        points INTEGER NOT NULL,
+        PRIMARY KEY (week, position)
+    )""",
+    """CREATE TABLE IF NOT EXISTS week_scores (
+        week INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        points INTEGER NOT NULL,
+        PRIMARY KEY (week, username)
+    )""",
+    """CREATE TABLE IF NOT EXISTS standings (
+        username TEXT PRIMARY KEY,
+        points INTEGER NOT NULL DEFAULT 0,
+        weeks INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS sessions (
+        sid_hash TEXT PRIMARY KEY,
+        username TEXT,
+        data TEXT NOT NULL,
+        expires DOUBLE PRECISION NOT NULL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT DEFAULT {PG_TIMESTAMP}
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_draft_picks_week_round ON draft_picks (week, round)",
+    "CREATE INDEX IF NOT EXISTS idx_draft_picks_week_username ON draft_picks (week, username)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_draft_picks_week_driver ON draft_picks (week, driver)",
+    "CREATE INDEX IF NOT EXISTS idx_picks_week_username ON picks (week, username)",
+    f"""CREATE TABLE IF NOT EXISTS draft_events (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        week INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        round INTEGER, username TEXT, driver TEXT,
+        data TEXT,
+        ts TEXT DEFAULT {PG_TIMESTAMP}
+    )""",
+    """CREATE TABLE IF NOT EXISTS draft_snapshots (
+        week INTEGER NOT NULL,
+        event_id BIGINT NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (week, event_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions (username)",
+    "CREATE INDEX IF NOT EXISTS idx_draft_events_week ON draft_events (week, id)",
+    """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+       BEGIN UPDATE data_versions SET version=version+1 WHERE name=TG_ARGV[0]; RETURN NULL; END
+       $$ LANGUAGE plpgsql""",
+]
+# The tables track_table() covers in the SQLite migrations.
+PG_TRACKED_TABLES = ["schedule", "drivers", "qualifying", "picks", "standings", "draft_picks"]
+# Migrations that move data as well; run after PG_SCHEMA when first applied.
+PG_DATA_MIGRATIONS = {10: backfill_draft_events}
+
+def schema_version(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""")
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return c.fetchone()[0]
+
+def run_migrations(c):
+    current = schema_version(c)
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version <= current: continue
+        fn(c)
+        c.execute("INSERT INTO schema_version (version, name) VALUES (?,?)", (version, name))
+        applied.append(version)
+    return applied
+
+LATEST_SCHEMA = MIGRATIONS[-1][0]
+
+def migrate_db(path=None, default_users=True):
+    """Create or upgrade the schema and seed drivers and default users.
+
+    Runs as one write transaction, so workers that reach it at the same time
+    apply it once and the others find nothing left to do. Returns the
+    migration versions applied.
+    """
+    conn=get_pool(path).acquire(); c=conn.cursor()
+    try:
+        begin_write(c)
+        applied = storage.create_schema(c)
+        seed_drivers(c)
+        if default_users: seed_users(c)
         conn.commit()
+    finally:
+        conn.close()
+    return applied
+
+def current_schema_version(path=None):
+    conn=get_pool(path).acquire(); c=conn.cursor()
+    try:
+        c.execute("SELECT MAX(version) FROM schema_version")
+        return c.fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
+_schema_ready = set()
+
+def ensure_schema(path=None):
+    # Worker boot: one version lookup. Migration normally happens once, from
+    # `flask db-migrate` or the gunicorn on_starting hook.
+    path = path or db_path()
+    if path in _schema_ready: return
+    if current_schema_version(path) < LATEST_SCHEMA:
+        migrate_db(path)
+    _schema_ready.add(path)
+
+# The queries every poll and page view runs; `flask db-plans` shows how
+# the database executes them.
+HOT_QUERIES = [
+    ("draft_state picks", "SELECT round, username, driver, ts FROM draft_picks WHERE week=? ORDER BY round ASC, ts ASC, id ASC", (1,)),
+    ("draft_state delta", "SELECT round, username, driver, ts FROM draft_picks WHERE week=? AND version>? ORDER BY round ASC, ts ASC, id ASC", (1, 0)),
+    ("undo last pick", "SELECT id, round, username, driver FROM draft_picks WHERE week=? ORDER BY round DESC, id DESC LIMIT 1", (1,)),
+    ("user_draft_picks", "SELECT round, driver FROM draft_picks WHERE week=? AND username=? ORDER BY round ASC", (1, "")),
+    ("pick availability", "SELECT 1 FROM draft_picks WHERE week=? AND driver=? LIMIT 1", (1, "")),
+    ("consolidate users", "SELECT DISTINCT username FROM draft_picks WHERE week=?", (1,)),
+    ("picks for week", "SELECT username,driver1,driver2,driver3,driver4,driver5,driver6 FROM picks WHERE week=? ORDER BY username", (1,)),
+    ("picks exists", "SELECT 1 FROM picks WHERE week=? AND username=? LIMIT 1", (1, "")),
+]
+
+def explain_hot_queries():
+    conn=get_conn(); c=conn.cursor()
+    plans=[]
+    for name, sql, params in HOT_QUERIES:
+        detail, full_scan = storage.explain(c, sql, params)
+        plans.append({"query":name, "plan":detail, "full_scan":full_scan})
     conn.close()
+    return plans
+
+# --- leagues ---
+# Each league lives in its own SQLite file under LEAGUES_DIR (or its own
+# schema on a shared server) and is served under /l/<league>/...; unprefixed
+# URLs keep serving DB_PATH. One league's pick transaction never waits on
+# another league's lock, and every per-league query runs against only that
+# league's rows.
+LEAGUE_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,39}$")
+
+def league_db_path(league):
+    if not LEAGUE_RE.match(league or ""):
+        return None
+    return os.path.join(LEAGUES_DIR, f"{league}.db")
+
+def list_leagues():
+    return sorted(l for l in storage.leagues() if LEAGUE_RE.match(l))
+
+def league_name(path):
+    """The league a database path belongs to; None for DB_PATH."""
+    return None if os.path.abspath(path) == os.path.abspath(DB_PATH) else Path(path).stem
+
+def league_path(league):
+    return DB_PATH if league is None else league_db_path(league)
+
+def create_league(league, admin=None):
+    """Create a league database; returns the admin's temporary password, if any."""
+    path = league_db_path(league)
+    if path is None:
+        raise ValueError("League names use lowercase letters, digits, '-' and '_'.")
+    if storage.exists(path):
+        raise ValueError(f"League {league} already exists.")
+    os.makedirs(LEAGUES_DIR, exist_ok=True)
+    migrate_db(path, default_users=admin is None)
+    if admin is None: return None
+    temp_pw = secrets.token_urlsafe(8)
+    with use_db(path):
+        set_user(admin, temp_pw, is_admin=True, must_change=True)
+    return temp_pw
+
+class LeagueMiddleware:
+    """Moves a leading /l/<league> from PATH_INFO into SCRIPT_NAME.
+
+    Flask then routes the rest as usual and url_for() keeps links inside the
+    league.
+    """
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        parts = environ.get("PATH_INFO", "").split("/", 3)
+        if len(parts) >= 3 and parts[0] == "" and parts[1] == "l" and parts[2]:
+            environ["picks.league"] = parts[2]
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + "/l/" + parts[2]
+            environ["PATH_INFO"] = "/" + (parts[3] if len(parts) > 3 else "")
+        return self.wsgi_app(environ, start_response)
+
+app.wsgi_app = LeagueMiddleware(app.wsgi_app)
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.rotate = False
+
+    def clear(self):
+        # Cleared at logout and login; either way the old id must stop working.
+        super().clear()
+        self.rotate = True
+
+# (db path, sid hash) -> (cached until, data); (db path, username) -> (cached until, user).
+# Only rows that exist are cached, and each cache keeps the USER_CACHE_SIZE
+# most recently used, so made-up cookies and usernames can't grow them.
+_session_cache = OrderedDict()
+_user_cache = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    with _auth_cache_lock:
+        e = cache.get(key)
+        if e is None: return None
+        if e[0] <= _time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return e[1]
+
+def cache_put(cache, key, value):
+    with _auth_cache_lock:
+        cache[key] = (_time.monotonic() + USER_CACHE_SECONDS, value)
+        cache.move_to_end(key)
+        while len(cache) > USER_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def sid_hash(sid):
+    return hashlib.sha256(sid.encode()).hexdigest()
+
+def revoke_sessions(username, path=None, keep=None):
+    """Sign username out everywhere (except the session id keep)."""
+    path = path or db_path()
+    conn=get_pool(path).acquire(); c=conn.cursor()
+    c.execute("DELETE FROM sessions WHERE username=? AND sid_hash!=?", (username, sid_hash(keep) if keep else ""))
+    conn.commit(); conn.close()
+    with _auth_cache_lock:
+        for key in [k for k, (_, data) in _session_cache.items() if k[0] == path and data and data.get("username") == username]:
+            del _session_cache[key]
+
+class LeagueSessionInterface(SessionInterface):
+    """Sessions kept in the league's database; the cookie holds only a random id.
+
+    Deleting a row revokes the session. Rows are cached per worker for
+    USER_CACHE_SECONDS, so a revocation made by another worker lands within
+    that time. Each league has its own path-scoped cookie and its own table:
+    logging into one league grants nothing in another.
+    """
+    def get_cookie_name(self, app):
+        league = request.environ.get("picks.league") if has_request_context() else None
+        name = super().get_cookie_name(app)
+        return f"{name}_{league}" if league else name
+
+    def get_cookie_path(self, app):
+        if has_request_context() and request.environ.get("picks.league"):
+            return request.script_root + "/"
+        return super().get_cookie_path(app)
+
+    def session_db(self, req):
+        league = req.environ.get("picks.league")
+        if not league: return DB_PATH
+        path = league_db_path(league)
+        return path if path and storage.exists(path) else None
+
+    def open_session(self, app, req):
+        sid = req.cookies.get(self.get_cookie_name(app))
+        path = self.session_db(req)
+        if not sid or path is None:
+            return ServerSession()
+        key = (path, sid_hash(sid))
+        data = cache_get(_session_cache, key)
+        if data is None:
+            ensure_schema(path)
+            conn=get_pool(path).acquire(); c=conn.cursor()
+            c.execute("SELECT data FROM sessions WHERE sid_hash=? AND expires>?", (key[1], _time.time()))
+            r=c.fetchone(); conn.close()
+            if not r:
+                return ServerSession()
+            data = json.loads(r[0])
+            cache_put(_session_cache, key, data)
+        return ServerSession(data, sid if data else None)
+
+    def save_session(self, app, sess, resp):
+        name = self.get_cookie_name(app); domain = self.get_cookie_domain(app); cookie_path = self.get_cookie_path(app)
+        path = self.session_db(request)
+        if path is None or not sess.modified: return
+        data = dict(sess)
+        conn=get_pool(path).acquire(); c=conn.cursor()
+        if sess.sid and sess and not sess.rotate:
+            c.execute("UPDATE sessions SET data=? WHERE sid_hash=?", (json.dumps(data), sid_hash(sess.sid)))
+            revoked = c.rowcount == 0
+            conn.commit(); conn.close()
+            if not revoked:
+                cache_put(_session_cache, (path, sid_hash(sess.sid)), data)
+                return
+            # Another worker revoked it since this one cached it.
+            with _auth_cache_lock: _session_cache.pop((path, sid_hash(sess.sid)), None)
+            resp.delete_cookie(name, domain=domain, path=cookie_path)
+            return
+        if sess.sid:
+            c.execute("DELETE FROM sessions WHERE sid_hash=?", (sid_hash(sess.sid),))
+            with _auth_cache_lock: _session_cache.pop((path, sid_hash(sess.sid)), None)
+        if not sess:
+            conn.commit(); conn.close()
+            resp.delete_cookie(name, domain=domain, path=cookie_path)
+            return
+        sid = secrets.token_urlsafe(32)
+        now = _time.time()
+        c.execute("DELETE FROM sessions WHERE expires<=?", (now,))
+        c.execute("INSERT INTO sessions (sid_hash, username, data, expires) VALUES (?,?,?,?)",
+                  (sid_hash(sid), data.get("username"), json.dumps(data), now + app.permanent_session_lifetime.total_seconds()))
+        conn.commit(); conn.close()
+        cache_put(_session_cache, (path, sid_hash(sid)), data)
+        resp.set_cookie(name, sid, expires=self.get_expiration_time(app, sess), httponly=self.get_cookie_httponly(app),
+                        domain=domain, path=cookie_path, secure=self.get_cookie_secure(app),
+                        samesite=self.get_cookie_samesite(app))
+        resp.vary.add("Cookie")
+
+app.session_interface = LeagueSessionInterface()
 
-init_db()
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = _time.perf_counter()
+    g.sql_token = _request_sql.set(RequestSQL(SLOW_REQUEST_MS > 0))
+
+@app.after_request
+def record_request_metrics(resp):
+    start = g.pop("metrics_start", None)
+    stats = _request_sql.get()
+    if start is None or stats is None: return resp
+    seconds = _time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.request(route, request.method, resp.status_code, seconds, stats)
+    if SLOW_REQUEST_MS > 0 and seconds * 1000 >= SLOW_REQUEST_MS:
+        with metrics.lock: metrics.slow += 1
+        sql = "".join(f"\n  {t*1000:8.2f} ms  {q}" for t, q in stats.statements)
+        app.logger.warning("Slow request %s %s%s took %.0f ms; %d queries, %.0f ms in SQLite%s",
+                           request.method, request.script_root, request.full_path.rstrip("?"),
+                           seconds * 1000, stats.count, stats.seconds * 1000, sql)
+    return resp
+
+@app.teardown_request
+def end_request_metrics(exc=None):
+    token = g.pop("sql_token", None)
+    if token is not None:
+        _request_sql.reset(token)
+
+@app.before_request
+def start_draft_clock():
+    draft_clock.start()
+    backup_scheduler.start()
+    event_bus.start()
+
+@app.before_request
+def select_league():
+    league = request.environ.get("picks.league")
+    if not league: return
+    path = league_db_path(league)
+    if path is None or not storage.exists(path):
+        abort(404)
+    ensure_schema(path)
+    g.db_token = _current_db.set(path)
+
+@app.before_request
+def check_session_user():
+    # Admin rights and the account itself are re-read from the user cache, so
+    # a deleted or demoted user loses access without logging out.
+    username = session.get("username")
+    if not username: return
+    user = get_user(username)
+    if user is None:
+        session.clear()
+    elif bool(session.get("is_admin")) != user["is_admin"]:
+        session["is_admin"] = user["is_admin"]
+
+@app.teardown_request
+def release_league(exc=None):
+    token = g.pop("db_token", None)
+    if token is not None:
+        _current_db.reset(token)
+
+@app.cli.command("create-league")
+@click.argument("league")
+@click.option("--admin", help="Create this admin user instead of the default users.")
+def create_league_command(league, admin):
+    """Create a new league database under LEAGUES_DIR."""
+    temp_pw = create_league(league, admin)
+    print(f"Created league {league} at /l/{league}/")
+    if temp_pw:
+        print(f"Temporary password for {admin}: {temp_pw}")
+
+@app.cli.command("db-migrate")
+def db_migrate_command():
+    """Apply pending schema migrations to every league and reseed drivers."""
+    for name, path in [("default", DB_PATH)] + [(l, league_db_path(l)) for l in list_leagues()]:
+        applied = migrate_db(path)
+        print(f"{name}: schema at version {LATEST_SCHEMA}; applied {applied or 'nothing'}.")
+
+@app.cli.command("db-backup")
+def db_backup_command():
+    """Snapshot every league's database now."""
+    if not storage.backups:
+        raise click.ClickException("DATABASE_URL is set; back up the shared database with pg_dump.")
+    for name, path in [("default", DB_PATH)] + [(l, league_db_path(l)) for l in list_leagues()]:
+        print(f"{name}: {take_backup(path)}")
+
+def cli_db_path(league, must_exist=True):
+    # The database a command's --league option points at; DB_PATH without one.
+    path = league_db_path(league) if league else DB_PATH
+    if path is None:
+        raise click.BadParameter("invalid league name", param_hint="--league")
+    if must_exist and not storage.exists(path):
+        raise click.ClickException(f"No database for league {league}." if league else f"No database at {path}.")
+    return path
+
+@app.cli.command("db-restore")
+@click.argument("snapshot")
+@click.option("--league", default=None, help="Restore into this league instead of the default database.")
+def db_restore_command(snapshot, league):
+    """Restore a database from a .db.gz snapshot after verifying its checksum."""
+    if not storage.backups:
+        raise click.ClickException("DATABASE_URL is set; restore the shared database with pg_restore.")
+    path = cli_db_path(league, must_exist=False)
+    if os.path.exists(path):
+        print(f"Saved the current database first: {take_backup(path)}")
+    try:
+        restore_backup(snapshot, path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Restored {path} from {snapshot}.")
+
+@app.cli.command("rebuild-standings")
+@click.option("--league", default=None, help="Rebuild this league instead of the default database.")
+def rebuild_standings_command(league):
+    """Recompute every week's scores and the season standings from scratch."""
+    with use_db(cli_db_path(league)):
+        conn=get_conn(); c=conn.cursor()
+        begin_write(c)
+        rebuild_standings(c)
+        conn.commit(); conn.close()
+    print("Standings rebuilt.")
+
+@app.cli.command("event-hub")
+@click.option("--listen", default=None, help="unix:///path or tcp://host:port; defaults to EVENT_BUS_URL.")
+def event_hub_command(listen):
+    """Relay draft events between every app process using EVENT_BUS_URL."""
+    url = listen or EVENT_BUS_URL
+    if not url:
+        raise click.UsageError("Set EVENT_BUS_URL or pass --listen.")
+    hub = EventHub(url)
+    print(f"Relaying draft events on {url}", flush=True)
+    try:
+        hub.serve_forever()
+    except KeyboardInterrupt:
+        hub.close()
+
+@app.cli.command("draft-replay")
+@click.option("--week", type=int, default=None, help="Only this week.")
+@click.option("--fix", is_flag=True, help="Rewrite drafts and draft_picks from the log where they differ.")
+@click.option("--league", default=None, help="Replay this league instead of the default database.")
+def draft_replay_command(week, fix, league):
+    """Replay each draft's event log and compare it with the drafts table."""
+    with use_db(cli_db_path(league)):
+        replay_drafts(week, fix)
+
+def replay_drafts(week, fix):
+    conn=get_conn(); c=conn.cursor()
+    begin_write(c)
+    if week is None:
+        c.execute("SELECT DISTINCT week FROM draft_events ORDER BY week")
+        weeks = [r[0] for r in c.fetchall()]
+    else:
+        weeks = [week]
+    for wk in weeks:
+        _, state = replay_draft(c, wk)
+        if state == draft_projection(c, wk):
+            print(f"Week {wk}: matches its log.")
+        elif fix:
+            write_projection(c, wk, state)
+            print(f"Week {wk}: rewritten from its log.")
+        else:
+            print(f"Week {wk}: differs from its log (rerun with --fix to rewrite it).")
+    conn.commit(); conn.close()
+
+@app.cli.command("db-plans")
+def db_plans_command():
+    """Print the query plan of each hot query."""
+    for p in explain_hot_queries():
+        flag = "FULL SCAN" if p["full_scan"] else "ok"
+        print(f"{p['query']}: {flag}")
+        for line in p["plan"]:
+            print(f"    {line}")
 
 def list_users():
     conn=get_conn(); c=conn.cursor()
@@ -110,30 +1396,109 @@ def list_users():
     rows=[{"username":r[0], "is_admin":bool(r[1]), "has_pw":bool(r[2]), "must_change_pw":bool(r[3])} for r in c.fetchall()]
     conn.close(); return rows
 
+class HashingBusy(Exception):
+    """Every password-hashing slot stayed busy for PASSWORD_HASH_WAIT_SECONDS."""
+
+# Hashing is deliberately slow; capping how many run at once keeps a burst
+# of logins from tying up every worker thread the draft pages need.
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_CONCURRENCY)
+
+@contextmanager
+def hashing_slot():
+    if not _hash_slots.acquire(timeout=PASSWORD_HASH_WAIT_SECONDS):
+        raise HashingBusy()
+    try:
+        yield
+    finally:
+        _hash_slots.release()
+
+def hash_password(password):
+    with hashing_slot():
+        return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+def check_password(password_hash, password):
+    with hashing_slot():
+        return check_password_hash(password_hash, password)
+
+# Werkzeug methods, weakest algorithm first: pbkdf2:<hash>:<iterations> and
+# scrypt:<n>:<r>:<p>. A stored hash keeps its parameters; a setting may omit them.
+HASH_ALGORITHMS = ["pbkdf2", "scrypt"]
+
+def hash_method(method):
+    """(algorithm, variant, cost) of a werkzeug method, or None if unknown."""
+    parts = method.split(":")
+    try:
+        if parts[0] == "pbkdf2":
+            return "pbkdf2", parts[1] if len(parts) > 1 else "sha256", int(parts[2]) if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        if parts[0] == "scrypt":
+            n, r, p = [int(x) for x in parts[1:4]] if len(parts) > 1 else (2**15, 8, 1)
+            return "scrypt", None, n * r * p
+    except (ValueError, IndexError):
+        pass
+    return None
+
+def needs_rehash(password_hash):
+    """True if PASSWORD_HASH_METHOD is stronger than the hash's own method:
+    a stronger algorithm, another pbkdf2 digest, or a strictly higher cost.
+    Never trades a stronger stored hash down to the setting."""
+    want, have = hash_method(PASSWORD_HASH_METHOD), hash_method(password_hash.split("$", 1)[0])
+    if want is None: return False
+    if have is None: return True
+    if want[0] != have[0]:
+        return HASH_ALGORITHMS.index(want[0]) > HASH_ALGORITHMS.index(have[0])
+    return want[1] != have[1] or want[2] > have[2]
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    resp = make_response("Too many sign-ins at once; please try again in a few seconds.", 503)
+    resp.headers["Retry-After"] = "2"
+    return resp
+
 def get_user(username):
+    # Cached for USER_CACHE_SECONDS; every write below drops the entry.
+    key = (db_path(), username)
+    user = cache_get(_user_cache, key)
+    if user is not None:
+        return user
     conn=get_conn(); c=conn.cursor()
     c.execute("SELECT username, password_hash, is_admin, must_change_pw FROM users WHERE username=?", (username,))
     r=c.fetchone(); conn.close()
     if not r: return None
-    return {"username":r[0], "password_hash":r[1], "is_admin":bool(r[2]), "must_change_pw":bool(r[3])}
+    user = {"username":r[0], "password_hash":r[1], "is_admin":bool(r[2]), "must_change_pw":bool(r[3])}
+    cache_put(_user_cache, key, user)
+    return user
+
+def forget_user(username):
+    with _auth_cache_lock:
+        _user_cache.pop((db_path(), username), None)
 
 def set_user(username, password=None, is_admin=False, must_change=True):
-    ph = generate_password_hash(password) if password else None
+    ph = hash_password(password) if password else None
     conn=get_conn(); c=conn.cursor()
-    c.execute("INSERT OR REPLACE INTO users (username, password_hash, is_admin, must_change_pw) VALUES (?,?,?,?)",
+    c.execute("""INSERT INTO users (username, password_hash, is_admin, must_change_pw) VALUES (?,?,?,?)
+                 ON CONFLICT(username) DO UPDATE SET password_hash=excluded.password_hash, is_admin=excluded.is_admin,
+                 must_change_pw=excluded.must_change_pw""",
               (username, ph, int(is_admin), int(must_change)))
     conn.commit(); conn.close()
+    forget_user(username)
 
-def reset_user_password(username, temp_password):
-    ph = generate_password_hash(temp_password)
+def set_password(username, password, must_change):
+    ph = hash_password(password)
     conn=get_conn(); c=conn.cursor()
-    c.execute("UPDATE users SET password_hash=?, must_change_pw=1 WHERE username=?", (ph, username))
+    c.execute("UPDATE users SET password_hash=?, must_change_pw=? WHERE username=?", (ph, int(must_change), username))
     conn.commit(); conn.close()
+    forget_user(username)
+
+def reset_user_password(username, temp_password):
+    set_password(username, temp_password, must_change=True)
+    revoke_sessions(username)
 
 def delete_user(username):
     conn=get_conn(); c=conn.cursor()
     c.execute("DELETE FROM users WHERE username=?", (username,))
     conn.commit(); conn.close()
+    forget_user(username)
+    revoke_sessions(username)
 
 def list_schedule():
     conn=get_conn(); c=conn.cursor()
@@ -163,12 +1528,11 @@ def parse_local_date(date_str):
     except Exception:
         return None
 
-def autodetect_current_week():
+def week_table():
     sched = list_schedule()
     if not sched:
-        return 1
+        return [], 1
     local_tz = tz()
-    now = datetime.now(local_tz)
 
     # Build a list of (week, advance_dt) where advance_dt is the Friday AFTER the race at 00:00 local time
     candidates = []
@@ -180,18 +1544,43 @@ def autodetect_current_week():
             continue
         adv_date = next_friday_after(d)
         adv_dt = local_tz.localize(datetime.combine(adv_date, time(0,0)))
-        candidates.append((row["week"], adv_dt))
+        candidates.append((int(row["week"]), adv_dt))
+    return candidates, sched[0]["week"]
 
+def pick_current_week(candidates, fallback, now):
+    """Return (week, valid_until); valid_until is None when it never expires."""
     if not candidates:
-        return sched[0]["week"]
+        return fallback, None
 
     # Find the first week whose advance_dt is in the future
     for wk, adv_dt in candidates:
         if now < adv_dt:
-            return int(wk)
+            return wk, adv_dt
 
     # If all advance dates have passed, stick on the last week
-    return int(candidates[-1][0])
+    return candidates[-1][0], None
+
+# db path -> {"version", "candidates", "fallback", "week", "until"}
+_week_cache = {}
+
+def invalidate_week_cache():
+    _week_cache.pop(db_path(), None)
+
+@timed("autodetect_current_week")
+def autodetect_current_week():
+    # The parsed schedule is reused until the schedule table changes (in any
+    # worker) or the cached week's advance boundary passes.
+    version = get_data_version("schedule")
+    entry = _week_cache.get(db_path())
+    metrics.cache("week", entry is not None and entry["version"] == version)
+    if entry is None or entry["version"] != version:
+        candidates, fallback = week_table()
+        entry = {"version":version, "candidates":candidates, "fallback":fallback, "week":None, "until":None}
+        _week_cache[db_path()] = entry
+    now = datetime.now(tz())
+    if entry["week"] is None or (entry["until"] is not None and now >= entry["until"]):
+        entry["week"], entry["until"] = pick_current_week(entry["candidates"], entry["fallback"], now)
+    return entry["week"]
 
 _SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
 def last_name_key(full_name:str):
@@ -204,32 +1593,286 @@ def last_name_key(full_name:str):
 
 def get_draft(week):
     conn=get_conn(); c=conn.cursor()
-    c.execute("SELECT week,order_csv,current_round,current_index,rounds_total,status FROM drafts WHERE week=?", (week,))
+    c.execute("""SELECT week,order_csv,current_round,current_index,rounds_total,status,version,base_version,pick_seconds,clock_deadline
+                 FROM drafts WHERE week=?""", (week,))
     r=c.fetchone(); conn.close()
     if not r: return None
-    return {"week":r[0], "order":r[1].split(","), "current_round":r[2], "current_index":r[3], "rounds_total":r[4], "status":r[5]}
+    return {"week":r[0], "order":r[1].split(","), "current_round":r[2], "current_index":r[3], "rounds_total":r[4], "status":r[5],
+            "version":r[6], "base_version":r[7], "pick_seconds":r[8], "clock_deadline":r[9]}
 
-def create_draft(week, order_list):
+def get_draft_version(week):
     conn=get_conn(); c=conn.cursor()
+    c.execute("SELECT version, base_version FROM drafts WHERE week=?", (week,))
+    r=c.fetchone(); conn.close()
+    return r
+
+def next_draft_version(c):
+    # One counter shared by every draft, so versions never repeat even after
+    # a week is reset and redrafted.
+    c.execute("UPDATE data_versions SET version=version+1 WHERE name='drafts'")
+    c.execute("SELECT version FROM data_versions WHERE name='drafts'")
+    return c.fetchone()[0]
+
+def clock_deadline(pick_seconds, status):
+    return _time.time() + pick_seconds if pick_seconds and status=="active" else None
+
+# --- draft event log ---
+# Every change to a draft is appended to draft_events (created, picked,
+# auto_picked, undone, reordered, reset) in the transaction that makes it.
+# The drafts and draft_picks rows are the log's projection, kept current
+# as events are written; replay_draft rebuilds the same state from the
+# latest snapshot plus the few events after it.
+def apply_draft_event(state, kind, round_no, username, driver, data):
+    """The draft state after one event; None while there is no draft."""
+    if kind == "created":
+        return {"order":data["order"], "rounds_total":data["rounds_total"], "pick_seconds":data["pick_seconds"],
+                "current_round":1, "current_index":0, "status":"active", "picks":[]}
+    if kind == "reset" or state is None:
+        return None
+    if kind in ("picked", "auto_picked"):
+        state["picks"].append([round_no, username, driver, (data or {}).get("auto", 0)])
+        state["current_round"], state["current_index"], state["status"] = next_pointer(state)
+    elif kind == "undone":
+        state["picks"].pop()
+        state["current_round"], state["current_index"] = previous_pointer(state)
+        state["status"] = "active"
+    elif kind == "reordered":
+        state["order"] = data["order"]
+    return state
+
+def replay_draft(c, week):
+    """Rebuild a week's draft from its log: (last event id, state or None)."""
+    c.execute("SELECT event_id, state FROM draft_snapshots WHERE week=? ORDER BY event_id DESC LIMIT 1", (week,))
+    r=c.fetchone()
+    last, state = (r[0], json.loads(r[1])) if r else (0, None)
+    c.execute("SELECT id, kind, round, username, driver, data FROM draft_events WHERE week=? AND id>? ORDER BY id", (week, last))
+    for last, kind, round_no, username, driver, data in c.fetchall():
+        state = apply_draft_event(state, kind, round_no, username, driver, json.loads(data) if data else None)
+    return last, state
+
+def snapshot_draft(c, week):
+    last, state = replay_draft(c, week)
+    if last:
+        c.execute("INSERT INTO draft_snapshots (week, event_id, state) VALUES (?,?,?) ON CONFLICT DO NOTHING",
+                  (week, last, json.dumps(state)))
+
+def log_draft_event(c, week, version, kind, round_no=None, username=None, driver=None, data=None):
+    """Append one event to the week's log, inside the caller's transaction.
+
+    A snapshot is written at every created or reset and after every
+    DRAFT_SNAPSHOT_EVERY other events, so a replay never reads more than
+    that many events.
+    """
+    c.execute("INSERT INTO draft_events (week, version, kind, round, username, driver, data) VALUES (?,?,?,?,?,?,?)",
+              (week, version, kind, round_no, username, driver, json.dumps(data) if data is not None else None))
+    if kind not in ("created", "reset"):
+        c.execute("""SELECT COUNT(*) FROM draft_events WHERE week=?
+                     AND id > COALESCE((SELECT MAX(event_id) FROM draft_snapshots WHERE week=?), 0)""", (week, week))
+        if c.fetchone()[0] < DRAFT_SNAPSHOT_EVERY: return
+    snapshot_draft(c, week)
+
+def draft_events(week, limit=50):
+    conn=get_conn(); c=conn.cursor()
+    c.execute("SELECT id, version, kind, round, username, driver, data, ts FROM draft_events WHERE week=? ORDER BY id DESC LIMIT ?",
+              (week, limit))
+    rows=[{"id":r[0], "version":r[1], "kind":r[2], "round":r[3], "username":r[4], "driver":r[5],
+           "data":json.loads(r[6]) if r[6] else None, "ts":r[7]} for r in c.fetchall()]
+    conn.close(); return rows
+
+def draft_projection(c, week):
+    # The drafts and draft_picks rows in the shape replay_draft returns.
+    c.execute("SELECT order_csv, rounds_total, pick_seconds, current_round, current_index, status FROM drafts WHERE week=?", (week,))
+    r=c.fetchone()
+    if not r: return None
+    c.execute("SELECT round, username, driver, auto FROM draft_picks WHERE week=? ORDER BY id", (week,))
+    return {"order":r[0].split(","), "rounds_total":r[1], "pick_seconds":r[2], "current_round":r[3], "current_index":r[4],
+            "status":r[5], "picks":[list(p) for p in c.fetchall()]}
+
+def write_projection(c, week, state):
+    """Replace a week's drafts and draft_picks rows with a replayed state."""
+    v = next_draft_version(c)
     c.execute("DELETE FROM draft_picks WHERE week=?", (week,))
-    c.execute("REPLACE INTO drafts (week,order_csv,current_round,current_index,rounds_total,status) VALUES (?,?,?,?,?,?)",
-              (week, ",".join(order_list), 1, 0, ROUNDS_TOTAL, "active"))
+    c.execute("DELETE FROM drafts WHERE week=?", (week,))
+    if state is None: return
+    c.execute("""INSERT INTO drafts (week,order_csv,current_round,current_index,rounds_total,status,version,base_version,pick_seconds,clock_deadline)
+                 VALUES (?,?,?,?,?,?,?,?,?,?)""",
+              (week, ",".join(state["order"]), state["current_round"], state["current_index"], state["rounds_total"],
+               state["status"], v, v, state["pick_seconds"], clock_deadline(state["pick_seconds"], state["status"])))
+    c.executemany("INSERT INTO draft_picks (week,round,username,driver,version,auto) VALUES (?,?,?,?,?,?)",
+                  [(week, r, u, dr, v, auto) for r, u, dr, auto in state["picks"]])
+
+def create_draft(week, order_list, pick_seconds=0):
+    conn=get_conn(); c=conn.cursor()
+    v = next_draft_version(c)
+    deadline = clock_deadline(pick_seconds, "active")
+    c.execute("DELETE FROM draft_picks WHERE week=?", (week,))
+    c.execute("""INSERT INTO drafts (week,order_csv,current_round,current_index,rounds_total,status,version,base_version,pick_seconds,clock_deadline)
+                 VALUES (?,?,?,?,?,?,?,?,?,?)
+                 ON CONFLICT(week) DO UPDATE SET order_csv=excluded.order_csv, current_round=excluded.current_round,
+                 current_index=excluded.current_index, rounds_total=excluded.rounds_total, status=excluded.status,
+                 version=excluded.version, base_version=excluded.base_version, pick_seconds=excluded.pick_seconds,
+                 clock_deadline=excluded.clock_deadline""",
+              (week, ",".join(order_list), 1, 0, ROUNDS_TOTAL, "active", v, v, pick_seconds, deadline))
+    log_draft_event(c, week, v, "created", data={"order":list(order_list), "rounds_total":ROUNDS_TOTAL, "pick_seconds":pick_seconds})
     conn.commit(); conn.close()
+    if deadline: draft_clock.schedule(db_path(), week, 1, 0, deadline)
+    broadcaster.publish(week)
+    run_queued_picks(week)
     return get_draft(week)
 
-def add_draft_pick(week, round_no, username, driver):
-    conn=get_conn(); c=conn.cursor()
-    c.execute("INSERT INTO draft_picks (week,round,username,driver) VALUES (?,?,?,?)", (week, round_no, username, driver))
-    conn.commit(); conn.close()
+class AvailableDrivers:
+    """The undrafted drivers for one week, kept sorted by last_name_key.
+
+    Sorted once from the drivers table; each pick then only marks its driver
+    gone (a dict lookup, O(1)) instead of diffing the full roster against
+    draft_picks and re-sorting on every request. listing() rebuilds the name
+    list, O(n), at most once per change.
+    """
+    def __init__(self, names, taken, drivers_version, base_version, draft_version):
+        names = sorted((n for n in names if n not in taken), key=lambda n: last_name_key(n) + (n,))
+        self.slots = {n: i for i, n in enumerate(names)}
+        self.entries = names
+        self.live = [True] * len(names)
+        self.drivers_version = drivers_version
+        self.base_version = base_version
+        self.draft_version = draft_version
+        self.names = None
+
+    def remove(self, name):
+        i = self.slots.pop(name, None)
+        if i is not None:
+            self.live[i] = False
+            self.names = None
+
+    def listing(self):
+        if self.names is None:
+            self.names = [n for n, live in zip(self.entries, self.live) if live]
+        return self.names
+
+# (db path, week) -> AvailableDrivers
+_available = {}
+_available_lock = threading.Lock()
+
+def draft_available_drivers(week):
+    """Undrafted drivers for `week`, sorted by last name."""
+    conn=get_conn(); c=conn.cursor()
+    c.execute("""SELECT (SELECT version FROM data_versions WHERE name='drivers'),
+                        (SELECT base_version FROM drafts WHERE week=?),
+                        (SELECT version FROM drafts WHERE week=?)""", (week, week))
+    drivers_version, base_version, draft_version = c.fetchone()
+    key = (db_path(), week)
+    with _available_lock:
+        idx = _available.get(key)
+        if (idx is not None and idx.drivers_version == drivers_version and idx.base_version == base_version
+                and draft_version is not None and idx.draft_version <= draft_version):
+            if idx.draft_version < draft_version:
+                # Another worker recorded picks; apply just those.
+                c.execute("SELECT driver FROM draft_picks WHERE week=? AND version>?", (week, idx.draft_version))
+                for (name,) in c.fetchall():
+                    idx.remove(name)
+                idx.draft_version = draft_version
+            conn.close()
+            metrics.cache("available_drivers", True)
+            return idx.listing()
+        metrics.cache("available_drivers", False)
+        c.execute("SELECT name FROM drivers")
+        all_drivers = [r[0] for r in c.fetchall()]
+        c.execute("SELECT driver FROM draft_picks WHERE week=?", (week,))
+        taken = {r[0] for r in c.fetchall()}
+        conn.close()
+        idx = AvailableDrivers(all_drivers, taken, drivers_version, base_version, draft_version or 0)
+        if draft_version is not None:
+            _available[key] = idx
+        else:
+            _available.pop(key, None)
+        return idx.listing()
+
+def note_draft_pick(week, driver, prev_version, version):
+    # Keep this worker's index current without another query.
+    with _available_lock:
+        idx = _available.get((db_path(), week))
+        if idx is not None and idx.draft_version == prev_version:
+            idx.remove(driver)
+            idx.draft_version = version
+
+class DraftGrid:
+    """A week's draft encoded for compact /draft_state responses.
+
+    Drivers are numbered by their place in a dictionary (the roster sorted by
+    last name), and picks are stored as one fixed-size array per round of
+    driver ids in draft-order slots, -1 while open. The grid is updated pick
+    by pick and its JSON re-encoded only when it changes, not on every poll.
+    """
+    def __init__(self, names, order, rounds_total, drivers_version, base_version):
+        self.names = sorted(names, key=last_name_key)
+        self.roster = len(self.names)
+        self.ids = {n: i for i, n in enumerate(self.names)}
+        self.slots = {u: i for i, u in enumerate(order)}
+        self.grid = [[-1] * len(order) for _ in range(rounds_total)]
+        self.dict_id = f"{drivers_version}-{base_version}"
+        self.drivers_version = drivers_version
+        self.base_version = base_version
+        self.version = 0
+        self.names_json = json.dumps(self.names)
+        self.grid_json = None
+
+    def place(self, round_no, username, driver):
+        # Returns the changed cell as [round, slot, driver id], or None.
+        slot = self.slots.get(username)
+        if slot is None or not 1 <= round_no <= len(self.grid): return None
+        i = self.ids.get(driver)
+        if i is None:
+            # A driver missing from the roster gets the next id. Picks replay
+            # in id order, so every worker numbers these the same way; the
+            # new dictionary id makes clients fetch the names again.
+            i = self.ids[driver] = len(self.names)
+            self.names.append(driver); self.names_json = json.dumps(self.names)
+            self.dict_id = f"{self.drivers_version}-{self.base_version}+{len(self.names) - self.roster}"
+        self.grid[round_no - 1][slot] = i
+        self.grid_json = None
+        return [round_no, slot, i]
 
-def draft_available_drivers(week):
+    def encoded_grid(self):
+        if self.grid_json is None:
+            self.grid_json = json.dumps(self.grid)
+        return self.grid_json
+
+# (db path, week) -> DraftGrid
+_grids = {}
+_grids_lock = threading.Lock()
+
+def draft_grid(week, d, since=None):
+    """Bring this week's DraftGrid up to d["version"] and return its
+    (dictionary id, encoded names, encoded grid, cells picked after since)."""
     conn=get_conn(); c=conn.cursor()
-    c.execute("SELECT name FROM drivers")
-    all_drivers = [r[0] for r in c.fetchall()]
-    c.execute("SELECT driver FROM draft_picks WHERE week=?", (week,))
-    taken = {r[0] for r in c.fetchall()}
-    conn.close()
-    return [d for d in all_drivers if d not in taken]
+    try:
+        c.execute("SELECT version FROM data_versions WHERE name='drivers'")
+        drivers_version = c.fetchone()[0]
+        key = (db_path(), week)
+        with _grids_lock:
+            gr = _grids.get(key)
+            if (gr is None or gr.drivers_version != drivers_version or gr.base_version != d["base_version"]
+                    or gr.version > d["version"]):
+                c.execute("SELECT name FROM drivers")
+                gr = _grids[key] = DraftGrid([r[0] for r in c.fetchall()], d["order"], d["rounds_total"],
+                                             drivers_version, d["base_version"])
+            start = gr.version if since is None else min(gr.version, since)
+            c.execute("SELECT round, username, driver, version FROM draft_picks WHERE week=? AND version>? AND version<=? ORDER BY id",
+                      (week, start, d["version"]))
+            cells = []
+            for round_no, username, driver, version in c.fetchall():
+                cell = gr.place(round_no, username, driver)
+                if cell and since is not None and version > since: cells.append(cell)
+            gr.version = d["version"]
+            return gr.dict_id, gr.names_json, gr.encoded_grid(), cells
+    finally:
+        conn.close()
+
+def compact_json(payload, **encoded):
+    # Splice already-encoded JSON values into the payload without re-encoding them.
+    body = json.dumps(payload)
+    extra = "".join(f', "{k}": {v}' for k, v in encoded.items())
+    return body[:-1] + extra + "}"
 
 def user_draft_picks(week, username):
     conn=get_conn(); c=conn.cursor()
@@ -237,7 +1880,11 @@ def user_draft_picks(week, username):
     rows = c.fetchall(); conn.close()
     return rows
 
-def advance_pointer(draft):
+def on_the_clock_for(draft):
+    order = draft["order"]
+    return order[draft["current_index"]] if draft["current_round"]%2==1 else list(reversed(order))[draft["current_index"]]
+
+def next_pointer(draft):
     order = draft["order"]; n = len(order)
     current_round = draft["current_round"]; current_index = draft["current_index"]
     if current_index + 1 < n:
@@ -247,13 +1894,15 @@ def advance_pointer(draft):
     status = draft["status"]
     if new_round > draft["rounds_total"]:
         status = "complete"
-    conn=get_conn(); c=conn.cursor()
-    c.execute("UPDATE drafts SET current_round=?, current_index=?, status=? WHERE week=?",
-              (new_round, new_index, status, draft["week"]))
-    conn.commit(); conn.close()
+    return new_round, new_index, status
 
-def consolidate_to_picks(week):
-    conn=get_conn(); c=conn.cursor()
+def previous_pointer(draft):
+    # The slot before the current one: the inverse of next_pointer.
+    if draft["current_index"] > 0:
+        return draft["current_round"], draft["current_index"] - 1
+    return draft["current_round"] - 1, len(draft["order"]) - 1
+
+def consolidate_week(c, week):
     c.execute("SELECT DISTINCT username FROM draft_picks WHERE week=?", (week,))
     users_in_draft = [r[0] for r in c.fetchall()]
     for uname in users_in_draft:
@@ -264,7 +1913,879 @@ def consolidate_to_picks(week):
             if not c.fetchone():
                 c.execute("""INSERT INTO picks (username,week,driver1,driver2,driver3,driver4,driver5,driver6)
                              VALUES (?,?,?,?,?,?,?,?)""", (uname, week, *ds))
+    score_week(c, week)
+
+def score_week(c, week):
+    """Recompute one week's scores and apply only the change to standings.
+
+    A user's week score is the points their six drivers earned in that
+    week's results. Standings hold running totals, so importing or
+    correcting a week never rescans the rest of the season.
+    """
+    c.execute("SELECT username, points FROM week_scores WHERE week=?", (week,))
+    old = dict(c.fetchall())
+    c.execute("SELECT 1 FROM results WHERE week=? LIMIT 1", (week,))
+    new = {}
+    if c.fetchone():
+        c.execute("""SELECT p.username, COALESCE(SUM(r.points), 0) FROM picks p
+                     LEFT JOIN results r ON r.week=p.week
+                          AND r.driver IN (p.driver1, p.driver2, p.driver3, p.driver4, p.driver5, p.driver6)
+                     WHERE p.week=? GROUP BY p.username""", (week,))
+        new = dict(c.fetchall())
+    if old == new: return
+    c.execute("DELETE FROM week_scores WHERE week=?", (week,))
+    c.executemany("INSERT INTO week_scores (week, username, points) VALUES (?,?,?)",
+                  [(week, u, pts) for u, pts in new.items()])
+    deltas = [(u, new.get(u, 0) - old.get(u, 0), (u in new) - (u in old)) for u in set(old) | set(new)]
+    c.executemany("""INSERT INTO standings (username, points, weeks) VALUES (?,?,?)
+                     ON CONFLICT(username) DO UPDATE SET points=standings.points+excluded.points, weeks=standings.weeks+excluded.weeks""",
+                  [d for d in deltas if d[1] or d[2]])
+
+def rebuild_standings(c):
+    c.execute("DELETE FROM week_scores")
+    c.execute("DELETE FROM standings")
+    c.execute("SELECT DISTINCT week FROM results")
+    for (week,) in c.fetchall():
+        score_week(c, week)
+
+# draft_picks.auto: how a pick was made.
+PICK_MANUAL, PICK_CLOCK, PICK_QUEUE = 0, 1, 2
+
+def load_draft_for_update(c, week):
+    c.execute("SELECT week,order_csv,current_round,current_index,rounds_total,status,version,pick_seconds FROM drafts WHERE week=?", (week,))
+    r=c.fetchone()
+    if not r: return None
+    return {"week":r[0], "order":r[1].split(","), "current_round":r[2], "current_index":r[3], "rounds_total":r[4], "status":r[5],
+            "version":r[6], "pick_seconds":r[7], "clock_deadline":None, "recorded":[]}
+
+def record_pick(c, d, username, driver, how=PICK_MANUAL):
+    """Insert a pick for the slot in `d` and move the pointer past it.
+
+    The pointer update is a compare-and-swap on (round, index); returns False
+    if the slot was already taken. `d` is updated in place.
+    """
+    v = next_draft_version(c)
+    new_round, new_index, status = next_pointer(d)
+    deadline = clock_deadline(d["pick_seconds"], status)
+    c.execute("""UPDATE drafts SET current_round=?, current_index=?, status=?, version=?, clock_deadline=?
+                 WHERE week=? AND current_round=? AND current_index=?""",
+              (new_round, new_index, status, v, deadline, d["week"], d["current_round"], d["current_index"]))
+    if c.rowcount != 1:
+        return False
+    c.execute("INSERT INTO draft_picks (week,round,username,driver,version,auto) VALUES (?,?,?,?,?,?)",
+              (d["week"], d["current_round"], username, driver, v, how))
+    log_draft_event(c, d["week"], v, "auto_picked" if how else "picked", d["current_round"], username, driver,
+                    {"auto":how} if how else None)
+    d["recorded"].append((driver, d["version"], v))
+    d.update(current_round=new_round, current_index=new_index, status=status, version=v, clock_deadline=deadline)
+    return True
+
+def queued_choice(c, week, username):
+    c.execute("""SELECT driver FROM pick_queues q WHERE week=? AND username=?
+                 AND NOT EXISTS (SELECT 1 FROM draft_picks p WHERE p.week=q.week AND p.driver=q.driver)
+                 ORDER BY position LIMIT 1""", (week, username))
+    r=c.fetchone()
+    return r[0] if r else None
+
+def run_queue(c, d):
+    # Keep picking while whoever is on the clock has a queued driver left, so
+    # several queued players in a row are drafted in this one transaction.
+    while d["status"]=="active":
+        username = on_the_clock_for(d)
+        driver = queued_choice(c, d["week"], username)
+        if not driver or not record_pick(c, d, username, driver, PICK_QUEUE):
+            break
+
+def finish_picks(c, d):
+    if d["status"]=="complete":
+        consolidate_week(c, d["week"])
+
+def after_picks(d):
+    # Bookkeeping once the pick transaction has committed.
+    week = d["week"]
+    if not d["recorded"]: return
+    if d["status"]=="complete":
+        page_cache.invalidate("all_picks", "picks")
+    if d["clock_deadline"]:
+        draft_clock.schedule(db_path(), week, d["current_round"], d["current_index"], d["clock_deadline"])
+    for driver, prev_version, version in d["recorded"]:
+        note_draft_pick(week, driver, prev_version, version)
+    broadcaster.publish(week)
+
+def auto_pick_choice(c, week, username):
+    """The driver to take for a player who ran out of time: their next queued
+    driver, else the best qualifier still available, else the first available
+    by last name."""
+    driver = queued_choice(c, week, username)
+    if driver: return driver
+    c.execute("""SELECT driver FROM qualifying q WHERE week=?
+                 AND NOT EXISTS (SELECT 1 FROM draft_picks p WHERE p.week=q.week AND p.driver=q.driver)
+                 ORDER BY position LIMIT 1""", (week,))
+    r=c.fetchone()
+    if r: return r[0]
+    c.execute("SELECT name FROM drivers WHERE name NOT IN (SELECT driver FROM draft_picks WHERE week=?)", (week,))
+    names=[r[0] for r in c.fetchall()]
+    return min(names, key=last_name_key) if names else None
+
+@timed("submit_pick")
+def submit_pick(week, username, driver, custom=False, expect=None, auto=False):
+    """Validate and record one pick in a single write transaction.
+
+    The turn check, availability check, insert, pointer move, any queued picks
+    that follow and (on the last pick) consolidation into `picks` all commit
+    together. `expect` is the (round, index) the client saw; the pointer
+    update is a compare-and-swap on it, so a second submission for the same
+    slot is rejected. With auto=True the pick is made for whoever is on the
+    clock. Returns None on success or a (message, status) pair.
+    """
+    if not driver and not auto:
+        return "Driver not available.", 400
+    conn=get_conn(); c=conn.cursor()
+    try:
+        begin_write(c)
+        d = load_draft_for_update(c, week)
+        if not d:
+            return "No draft for this week.", 404
+        if d["status"]=="complete":
+            return "Draft is complete.", 409
+        if expect is not None and expect != (d["current_round"], d["current_index"]):
+            return "That pick has already been made.", 409
+        if auto:
+            username = on_the_clock_for(d)
+            driver = auto_pick_choice(c, week, username)
+            if not driver:
+                return "No drivers left to pick.", 409
+            custom = True  # qualifiers are not always in the drivers list
+        if username!=on_the_clock_for(d):
+            return "Not your turn.", 403
+        if custom:
+            c.execute("INSERT INTO drivers (name) VALUES (?) ON CONFLICT DO NOTHING", (driver,))
+        else:
+            c.execute("SELECT 1 FROM drivers WHERE name=?", (driver,))
+            if not c.fetchone():
+                return "Driver not available.", 400
+        c.execute("SELECT 1 FROM draft_picks WHERE week=? AND driver=? LIMIT 1", (week, driver))
+        if c.fetchone():
+            return "Driver not available.", 400
+        if not record_pick(c, d, username, driver, PICK_CLOCK if auto else PICK_MANUAL):
+            return "That pick has already been made.", 409
+        run_queue(c, d)
+        finish_picks(c, d)
+        conn.commit()
+    finally:
+        conn.close()
+    after_picks(d)
+    return None
+
+def run_queued_picks(week):
+    """Draft from the queues of whoever is on the clock, if they have one."""
+    conn=get_conn(); c=conn.cursor()
+    try:
+        begin_write(c)
+        d = load_draft_for_update(c, week)
+        if not d: return
+        run_queue(c, d)
+        finish_picks(c, d)
+        conn.commit()
+    finally:
+        conn.close()
+    after_picks(d)
+
+def undo_last_pick(week):
+    """Take back the most recent pick and put its player back on the clock.
+
+    The pick to remove is the latest in the highest round, read backwards off
+    the (week, round) index, and the pointer moves back one slot, so this
+    costs the same at any point in the draft. Undoing the last pick of a
+    complete draft also drops the week's consolidated picks. Bumps
+    base_version, so caches and clients reload the draft rather than apply a
+    delta. Returns (round, username, driver); raises ValueError if there is
+    nothing to undo.
+    """
+    conn=get_conn(); c=conn.cursor()
+    try:
+        begin_write(c)
+        d = load_draft_for_update(c, week)
+        if not d:
+            raise ValueError("No draft for this week.")
+        was_complete = d["status"]=="complete"
+        round_no, index = previous_pointer(d)
+        c.execute("SELECT id, round, username, driver FROM draft_picks WHERE week=? ORDER BY round DESC, id DESC LIMIT 1", (week,))
+        r=c.fetchone()
+        if round_no < 1 or not r:
+            raise ValueError("No picks to undo.")
+        pick_id, _, username, driver = r
+        if on_the_clock_for(dict(d, current_round=round_no, current_index=index)) != username:
+            raise ValueError("The draft was reordered after that pick, so it can't be undone.")
+        v = next_draft_version(c)
+        deadline = clock_deadline(d["pick_seconds"], "active")
+        c.execute("DELETE FROM draft_picks WHERE id=?", (pick_id,))
+        c.execute("""UPDATE drafts SET current_round=?, current_index=?, status='active', version=?, base_version=?, clock_deadline=?
+                     WHERE week=?""", (round_no, index, v, v, deadline, week))
+        if was_complete:
+            c.execute("DELETE FROM picks WHERE week=?", (week,))
+            score_week(c, week)
+        log_draft_event(c, week, v, "undone", round_no, username, driver)
+        conn.commit()
+    finally:
+        conn.close()
+    if was_complete:
+        page_cache.invalidate("all_picks", "picks")
+    if deadline: draft_clock.schedule(db_path(), week, round_no, index, deadline)
+    broadcaster.publish(week)
+    return round_no, username, driver
+
+def reorder_draft(week, order):
+    """Change the draft order for the rounds still to come, keeping the picks
+    already made; returns an error message or None.
+
+    Only allowed between rounds: mid-round, a player who already picked could
+    land on a later slot of the same round and pick twice in it while another
+    misses it.
+    """
+    conn=get_conn(); c=conn.cursor()
+    try:
+        begin_write(c)
+        d = load_draft_for_update(c, week)
+        if not d:
+            return "No draft for this week."
+        if d["status"]=="complete":
+            return "Draft is complete."
+        if d["current_index"] != 0:
+            return f"Round {d['current_round']} is under way; reorder once its last pick is in."
+        if sorted(order) != sorted(d["order"]):
+            return f"Reorder the same players: {', '.join(sorted(d['order']))}"
+        v = next_draft_version(c)
+        deadline = clock_deadline(d["pick_seconds"], d["status"])
+        c.execute("UPDATE drafts SET order_csv=?, version=?, base_version=?, clock_deadline=? WHERE week=?",
+                  (",".join(order), v, v, deadline, week))
+        log_draft_event(c, week, v, "reordered", data={"order":list(order)})
+        conn.commit()
+    finally:
+        conn.close()
+    if deadline: draft_clock.schedule(db_path(), week, d["current_round"], d["current_index"], deadline)
+    broadcaster.publish(week)
+    run_queued_picks(week)
+    return None
+
+def get_pick_queue(week, username):
+    conn=get_conn(); c=conn.cursor()
+    c.execute("SELECT driver FROM pick_queues WHERE week=? AND username=? ORDER BY position", (week, username))
+    rows=[r[0] for r in c.fetchall()]; conn.close()
+    return rows
+
+def set_pick_queue(week, username, drivers):
+    """Replace a player's queue; returns an error message or None."""
+    drivers = list(dict.fromkeys(d for d in drivers if d))
+    conn=get_conn(); c=conn.cursor()
+    if drivers:
+        c.execute(f"SELECT name FROM drivers WHERE name IN ({','.join('?'*len(drivers))})", drivers)
+        known = {r[0] for r in c.fetchall()}
+        unknown = [d for d in drivers if d not in known]
+        if unknown:
+            conn.close()
+            return f"Unknown driver(s): {', '.join(unknown)}"
+    c.execute("DELETE FROM pick_queues WHERE week=? AND username=?", (week, username))
+    c.executemany("INSERT INTO pick_queues (week, username, position, driver) VALUES (?,?,?,?)",
+                  [(week, username, i, d) for i, d in enumerate(drivers, 1)])
     conn.commit(); conn.close()
+    run_queued_picks(week)
+    return None
+
+class DraftClock:
+    """Auto-picks for whoever is on the clock when their time runs out.
+
+    One background thread per process sleeps on a heap of pick deadlines.
+    Each worker schedules the deadlines it sets and also rescans active drafts
+    every CLOCK_RESCAN_SECONDS, so a deadline outlives the worker that set it.
+    Several workers may fire for the same slot; the compare-and-swap in
+    submit_pick lets only one auto-pick land.
+    """
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.heap = []
+        self.due = {}
+        self.thread = None
+        self.next_rescan = 0
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive(): return
+        with self.cond:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="draft-clock", daemon=True)
+                self.thread.start()
+
+    def schedule(self, path, week, round_no, index, deadline):
+        with self.cond:
+            if self.due.get((path, week)) == (deadline, round_no, index): return
+            self.due[(path, week)] = (deadline, round_no, index)
+            heapq.heappush(self.heap, (deadline, path, week, round_no, index))
+            self.cond.notify()
+        self.start()
+
+    def remaining(self, deadline):
+        return max(0.0, deadline - _time.time()) if deadline else None
+
+    def _expired(self):
+        with self.cond:
+            now = _time.time()
+            expired = []
+            while self.heap and self.heap[0][0] <= now:
+                deadline, path, week, round_no, index = heapq.heappop(self.heap)
+                # Entries replaced by a later schedule() are skipped here.
+                if self.due.get((path, week)) == (deadline, round_no, index):
+                    del self.due[(path, week)]
+                    expired.append((path, week, round_no, index))
+            if not expired:
+                wake = min(self.heap[0][0] if self.heap else self.next_rescan, self.next_rescan)
+                self.cond.wait(max(0.05, wake - now))
+            return expired
+
+    def _rescan(self):
+        for path in [DB_PATH] + [league_db_path(l) for l in list_leagues()]:
+            try:
+                rows = self._clocked_drafts(path)
+            except Exception:
+                app.logger.exception("Draft clock rescan failed for %s", path)
+                continue
+            for week, round_no, index, deadline in rows:
+                self.schedule(path, week, round_no, index, deadline)
+
+    def _clocked_drafts(self, path):
+        if not storage.exists(path): return []
+        # Leagues this worker isn't serving get a one-off connection that
+        # is really closed afterwards, so the rescan never leaves a pooled
+        # connection (and its WAL file handles) open per league.
+        pool = _pools.get(path)
+        conn = pool.acquire() if pool else storage.connect(path)
+        try:
+            c=conn.cursor()
+            c.execute("SELECT week, current_round, current_index, clock_deadline FROM drafts WHERE status='active' AND clock_deadline IS NOT NULL")
+            return c.fetchall()
+        finally:
+            conn.close()
+
+    def _auto_pick(self, path, week, round_no, index):
+        with use_db(path):
+            err = submit_pick(week, None, None, expect=(round_no, index), auto=True)
+        # Losing the slot to a pick made meanwhile is expected; anything else
+        # leaves the draft waiting, and the next rescan retries it.
+        if err and err[0] not in ("That pick has already been made.", "Draft is complete.", "No draft for this week."):
+            app.logger.warning("Auto-pick stalled for week %s in %s: %s", week, path, err[0])
+
+    def _run(self):
+        while True:
+            try:
+                if _time.time() >= self.next_rescan:
+                    self.next_rescan = _time.time() + CLOCK_RESCAN_SECONDS
+                    self._rescan()
+                for path, week, round_no, index in self._expired():
+                    try:
+                        self._auto_pick(path, week, round_no, index)
+                    except Exception:
+                        app.logger.exception("Auto-pick failed for week %s in %s", week, path)
+            except Exception:
+                # Never let the clock thread die: only a request would restart it.
+                app.logger.exception("Draft clock error")
+                _time.sleep(1)
+
+draft_clock = DraftClock()
+
+# --- backups ---
+# Snapshots are taken with SQLite's online backup API a few pages at a time,
+# so writers keep going while a copy is made, then gzipped next to a sha256
+# sidecar. Finished snapshots never change, so they can be streamed as-is.
+try:
+    import fcntl
+except ImportError:  # not on Windows; backups then rely on the age check alone
+    fcntl = None
+
+def backup_label(path):
+    # Leagues can't start with "_", so the default database never collides.
+    return "_default" if os.path.abspath(path) == os.path.abspath(DB_PATH) else Path(path).stem
+
+def list_backups(path):
+    folder = os.path.join(BACKUP_DIR, backup_label(path))
+    if not os.path.isdir(folder): return []
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".db.gz"))
+
+def latest_backup(path):
+    snaps = list_backups(path)
+    return snaps[-1] if snaps else None
+
+def backup_checksum(snapshot):
+    try:
+        with open(snapshot + ".sha256") as f:
+            return f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def copy_db(src, dest):
+    # Copies BACKUP_PAGES_PER_STEP pages per step, yielding between steps so
+    # writers on other connections are never held up for the whole copy.
+    src.backup(dest, pages=BACKUP_PAGES_PER_STEP, sleep=0.005)
+
+def take_backup(path):
+    """Write a gzipped, checksummed snapshot of path and return its filename."""
+    label = backup_label(path)
+    folder = os.path.join(BACKUP_DIR, label)
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    snapshot = os.path.join(folder, f"{label}-{stamp}.db.gz")
+    fd, raw = tempfile.mkstemp(dir=folder, suffix=".tmp"); os.close(fd)
+    try:
+        src = sqlite3.connect(path); dest = sqlite3.connect(raw)
+        try:
+            copy_db(src, dest)
+        finally:
+            dest.close(); src.close()
+        with open(raw, "rb") as f, gzip.open(raw + ".gz", "wb") as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        digest = file_sha256(raw + ".gz")
+        with open(snapshot + ".sha256", "w") as f:
+            f.write(f"{digest}  {os.path.basename(snapshot)}\n")
+        os.replace(raw + ".gz", snapshot)
+    finally:
+        for leftover in (raw, raw + ".gz"):
+            if os.path.exists(leftover): os.remove(leftover)
+    for old in list_backups(path)[:-BACKUP_KEEP] if BACKUP_KEEP > 0 else []:
+        os.remove(old)
+        if os.path.exists(old + ".sha256"): os.remove(old + ".sha256")
+    return snapshot
+
+def restore_backup(snapshot, path):
+    """Replace the database at path with a verified snapshot, in place.
+
+    Data versions only move forward, so caches and draft clients in running
+    workers notice the change instead of serving what they had before.
+    """
+    expected = backup_checksum(snapshot)
+    if expected is None:
+        raise ValueError(f"no checksum file for {snapshot}")
+    if file_sha256(snapshot) != expected:
+        raise ValueError(f"checksum mismatch for {snapshot}")
+    fd, raw = tempfile.mkstemp(suffix=".db"); os.close(fd)
+    try:
+        with gzip.open(snapshot, "rb") as f, open(raw, "wb") as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        src = sqlite3.connect(raw)
+        try:
+            if src.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                raise ValueError(f"{snapshot} failed integrity_check")
+            dest = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+            try:
+                live = dict(dest.execute("SELECT name, version FROM data_versions").fetchall())
+                copy_db(src, dest)
+                restored = dict(dest.execute("SELECT name, version FROM data_versions").fetchall())
+                dest.executemany("INSERT OR REPLACE INTO data_versions (name, version) VALUES (?,?)",
+                                 [(n, max(live.get(n, 0), restored.get(n, 0)) + 1) for n in set(live) | set(restored)])
+                dest.commit()
+            finally:
+                dest.close()
+        finally:
+            src.close()
+    finally:
+        os.remove(raw)
+    migrate_db(path)
+
+class BackupScheduler:
+    """Takes a snapshot of every database once per BACKUP_INTERVAL_SECONDS.
+
+    Off unless BACKUP_INTERVAL_SECONDS is set. Every worker runs one; a file lock and the age of the newest snapshot
+    keep them from backing up the same database twice.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if not storage.backups or BACKUP_INTERVAL_SECONDS <= 0 or (self.thread is not None and self.thread.is_alive()): return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="db-backup", daemon=True)
+                self.thread.start()
+
+    def due(self, path):
+        snap = latest_backup(path)
+        return snap is None or _time.time() - os.path.getmtime(snap) >= BACKUP_INTERVAL_SECONDS
+
+    def run_once(self):
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        with open(os.path.join(BACKUP_DIR, ".lock"), "w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return  # another worker is backing up
+            for path in [DB_PATH] + [league_db_path(l) for l in list_leagues()]:
+                if os.path.exists(path) and self.due(path):
+                    take_backup(path)
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except (OSError, sqlite3.Error):
+                app.logger.exception("Scheduled backup failed")
+            _time.sleep(min(BACKUP_INTERVAL_SECONDS, 60))
+
+backup_scheduler = BackupScheduler()
+
+def draft_signature(conn, week):
+    c=conn.cursor()
+    c.execute("SELECT version, current_round, current_index, status FROM drafts WHERE week=?", (week,))
+    r=c.fetchone()
+    if not r: return {"week":week, "status":"none"}
+    return {"week":week, "version":r[0], "current_round":r[1], "current_index":r[2], "status":r[3]}
+
+# --- event bus ---
+# Draft changes go out on an event bus as {"league": name or None, "week": n}.
+# Unset EVENT_BUS_URL keeps them inside this process, and the watcher thread
+# below picks up what other workers commit. unix:///path or tcp://host:port
+# relays them through a hub (`flask event-hub`) to every process and host
+# connected to it, so their viewers hear about a pick straight away.
+EVENT_BUS_URL = os.environ.get("EVENT_BUS_URL", "")
+
+def bus_address(url):
+    if url.startswith("unix://"):
+        return socket.AF_UNIX, url[len("unix://"):]
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        if host and port.isdigit():
+            return socket.AF_INET, (host, int(port))
+    raise ValueError(f"EVENT_BUS_URL must be unix:///path or tcp://host:port, not {url!r}")
+
+class LocalEventBus:
+    """Delivers each event to this process's handlers only."""
+    def __init__(self):
+        self.handlers = []
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.handle(event)
+
+    def handle(self, event):
+        for handler in list(self.handlers):
+            try:
+                handler(event)
+            except Exception:
+                app.logger.exception("Event handler failed for %r", event)
+
+class SocketEventBus(LocalEventBus):
+    """Relays events through an EventHub as one JSON object per line.
+
+    Published events are handled here at once and sent to the hub, which
+    passes them to every other connection. A background thread holds the
+    hub connection and reconnects after a failure; while it is down events
+    stay local and the watcher thread still catches remote picks.
+    """
+    def __init__(self, url):
+        super().__init__()
+        self.family, self.address = bus_address(url)
+        self.lock = threading.Lock()
+        self.sock = None
+        self.thread = None
+        self.pid = os.getpid()
+
+    def start(self):
+        if self.pid == os.getpid() and self.thread is not None and self.thread.is_alive(): return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.sock = None; self.thread = None; self.pid = os.getpid()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+                self.thread.start()
+
+    def publish(self, event):
+        self.start()
+        self.handle(event)
+        line = (json.dumps(event) + "\n").encode()
+        with self.lock:
+            if self.sock is None: return
+            try:
+                self.sock.sendall(line)
+            except OSError:
+                self.sock.close(); self.sock = None
+
+    def _run(self):
+        while True:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                _time.sleep(1)
+                continue
+            with self.lock: self.sock = sock
+            try:
+                for line in sock.makefile("rb"):
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.handle(event)
+            except OSError:
+                pass
+            finally:
+                with self.lock:
+                    if self.sock is sock: self.sock = None
+                sock.close()
+            _time.sleep(0.5)
+
+class EventHub:
+    """Relays every line a client sends to all the other clients.
+
+    Each client has its own send queue and writer thread, so one stuck
+    client can't hold up the rest; it is dropped once its queue is full.
+    """
+    def __init__(self, url, queue_size=1000):
+        family, address = bus_address(url)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.remove(address)  # left behind by a previous hub
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen(128)
+        self.queue_size = queue_size
+        self.clients = {}  # socket -> send queue
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return  # closed
+            out = queue.Queue(self.queue_size)
+            with self.lock: self.clients[sock] = out
+            threading.Thread(target=self._relay, args=(sock,), name="event-hub-read", daemon=True).start()
+            threading.Thread(target=self._send, args=(sock, out), name="event-hub-send", daemon=True).start()
+
+    def _relay(self, sock):
+        try:
+            for line in sock.makefile("rb"):
+                with self.lock: others = [(s, q) for s, q in self.clients.items() if s is not sock]
+                for other, out in others:
+                    try:
+                        out.put_nowait(line)
+                    except queue.Full:
+                        self._drop(other)
+        except OSError:
+            pass
+        finally:
+            self._drop(sock)
+
+    def _send(self, sock, out):
+        while True:
+            line = out.get()
+            if line is None: break
+            try:
+                sock.sendall(line)
+            except OSError:
+                self._drop(sock)
+                break
+        sock.close()
+
+    def _drop(self, sock):
+        with self.lock:
+            out = self.clients.pop(sock, None)
+        if out is None: return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        while True:
+            try:
+                out.put_nowait(None); break
+            except queue.Full:
+                try: out.get_nowait()
+                except queue.Empty: pass
+
+    def close(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)  # wakes the accept() in serve_forever
+        except OSError:
+            pass
+        self.server.close()
+        with self.lock: clients = list(self.clients)
+        for sock in clients:
+            self._drop(sock)
+
+event_bus = SocketEventBus(EVENT_BUS_URL) if EVENT_BUS_URL else LocalEventBus()
+
+class DraftBroadcaster:
+    """Pushes draft changes to every open /draft_stream in this process.
+
+    Listeners are keyed by (database path, week). Picks are published on the
+    event bus, which brings them back here and, with a socket bus, to every
+    other process. Picks made by processes the bus doesn't reach are picked
+    up by one watcher thread per process, which checks a cheap change token
+    (PRAGMA data_version on SQLite) for each database that has listeners and
+    only re-reads those drafts when it has actually changed.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listeners = {}
+        self.last = {}
+        self.watcher = None
+
+    def subscribe(self, week, callback, path=None):
+        key = (path or db_path(), week)
+        with self.lock:
+            self.listeners.setdefault(key, set()).add(callback)
+            if self.watcher is None or not self.watcher.is_alive():
+                self.watcher = threading.Thread(target=self._watch, name="draft-watcher", daemon=True)
+                self.watcher.start()
+        event_bus.start()
+
+    def unsubscribe(self, week, callback, path=None):
+        key = (path or db_path(), week)
+        with self.lock:
+            cbs = self.listeners.get(key)
+            if cbs is None: return
+            cbs.discard(callback)
+            if not cbs:
+                del self.listeners[key]
+                self.last.pop(key, None)
+
+    def viewer_count(self):
+        with self.lock:
+            return sum(len(cbs) for cbs in self.listeners.values())
+
+    def publish(self, week):
+        event_bus.publish({"league": league_name(db_path()), "week": week})
+
+    def on_event(self, event):
+        path = league_path(event.get("league"))
+        key = (path, event.get("week"))
+        with self.lock:
+            if path is None or key not in self.listeners: return
+        conn=get_pool(path).acquire()
+        try:
+            sig = draft_signature(conn, key[1])
+        finally:
+            conn.close()
+        self._deliver(key, sig)
+
+    def _deliver(self, key, sig):
+        with self.lock:
+            if self.last.get(key) == sig: return
+            self.last[key] = sig
+            cbs = list(self.listeners.get(key, ()))
+        for cb in cbs:
+            cb(sig)
+
+    def _watch(self):
+        watched = {}
+        try:
+            while True:
+                _time.sleep(STREAM_POLL_SECONDS)
+                with self.lock:
+                    keys = list(self.listeners)
+                by_path = {}
+                for path, week in keys:
+                    by_path.setdefault(path, []).append(week)
+                for path in [p for p in watched if p not in by_path]:
+                    watched.pop(path)[0].close()
+                for path, weeks in by_path.items():
+                    if path not in watched:
+                        watched[path] = [storage.watch_connection(path), None]
+                    conn, seen = watched[path]
+                    try:
+                        version = storage.change_token(conn)
+                        if version == seen: continue
+                        watched[path][1] = version
+                        for week in weeks:
+                            self._deliver((path, week), draft_signature(conn, week))
+                    except sqlite3.Error:
+                        watched[path][1] = None
+        finally:
+            for conn, _ in watched.values():
+                conn.close()
+
+broadcaster = DraftBroadcaster()
+event_bus.subscribe(broadcaster.on_event)
+
+# Last, because migrations may replay drafts with the helpers above.
+ensure_schema()
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+class ResponseCache:
+    """Rendered read-only pages, keyed by route and arguments.
+
+    Each entry remembers the data_versions of the tables it was rendered
+    from and is only served while those still match, so writes made by any
+    worker retire it. Write paths in this worker also drop entries directly.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, versions):
+        with self.lock:
+            e = self.entries.get(key)
+            if e is not None and e[0] == versions:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return e[1], e[2]
+            self.misses += 1
+            return None
+
+    def put(self, key, versions, body):
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        with self.lock:
+            self.entries[key] = (versions, body, etag)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return body, etag
+
+    def invalidate(self, *routes):
+        with self.lock:
+            for key in [k for k in self.entries if not routes or k[1] in routes]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {"entries":len(self.entries), "hits":self.hits, "misses":self.misses,
+                    "hit_ratio":(self.hits/total if total else 0.0)}
+
+page_cache = ResponseCache(PAGE_CACHE_SIZE)
+
+def cached_page(route, args, tables, render, mimetype="text/html"):
+    versions = get_data_versions(tables)
+    key = (db_path(), route) + tuple(args)
+    entry = page_cache.get(key, versions)
+    if entry is None:
+        entry = page_cache.put(key, versions, render())
+    body, etag = entry
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(body)
+        resp.mimetype = mimetype
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
 
 @app.route("/", methods=["GET","POST"])
 def login():
@@ -272,7 +2793,10 @@ def login():
         u = request.form.get("username","").strip()
         p = request.form.get("password","")
         user = get_user(u)
-        if user and user["password_hash"] and check_password_hash(user["password_hash"], p):
+        if user and user["password_hash"] and check_password(user["password_hash"], p):
+            if needs_rehash(user["password_hash"]):
+                set_password(u, p, user["must_change_pw"])
+            session.clear()  # a fresh session id on every login
             session["username"] = u
             session["is_admin"] = user["is_admin"]
             session["just_logged_in"] = True
@@ -307,17 +2831,15 @@ def change_password():
         new1 = request.form.get("new1","")
         new2 = request.form.get("new2","")
         user = get_user(session["username"])
-        if not user or not user["password_hash"] or not check_password_hash(user["password_hash"], current):
+        if not user or not user["password_hash"] or not check_password(user["password_hash"], current):
             message="Current password is incorrect."
         elif len(new1) < 8:
             message="New password must be at least 8 characters."
         elif new1 != new2:
             message="New passwords do not match."
         else:
-            ph = generate_password_hash(new1)
-            conn=get_conn(); c=conn.cursor()
-            c.execute("UPDATE users SET password_hash=?, must_change_pw=0 WHERE username=?", (ph, session["username"]))
-            conn.commit(); conn.close()
+            set_password(session["username"], new1, must_change=False)
+            revoke_sessions(session["username"], keep=session.sid)
             return redirect(url_for("post_login"))
     return render_template("change_password.html", message=message)
 
@@ -347,79 +2869,129 @@ def admin_users():
             if not uname: message="Username is required for delete."
             else:
                 delete_user(uname); message=f"Deleted {uname}."
+        elif action=="revoke":
+            uname = request.form.get("username","").strip()
+            if not uname: message="Username is required."
+            else:
+                revoke_sessions(uname); message=f"Signed {uname} out everywhere."
     return render_template("admin_users.html", users=list_users(), message=message, temp_pw=temp_pw)
 
 @app.route("/admin_schedule", methods=["GET","POST"])
 def admin_schedule():
     if not session.get("is_admin"): return "Unauthorized",403
-    message=None
+    message=None; errors=[]
     if request.method=="POST":
-        csv_text = request.form.get("csv_text","").strip()
-        if not csv_text:
-            message="Please paste CSV with headers: week,race_name,race_date,tv_network,start_time"
+        source = csv_upload()
+        if source is None:
+            message="Please paste or upload CSV with headers: week,race_name,race_date,tv_network,start_time"
         else:
+            conn=get_conn(); c=conn.cursor()
             try:
-                reader = csv.DictReader(StringIO(csv_text))
-                rows=[]
-                for row in reader:
-                    wk = int(row.get("week","").strip())
-                    name = row.get("race_name","").strip()
-                    date_s = row.get("race_date","").strip() if row.get("race_date") else None
-                    net = row.get("tv_network","").strip() if row.get("tv_network") else None
-                    st = row.get("start_time","").strip() if row.get("start_time") else None
-                    if not wk or not name:
-                        raise ValueError("Missing week or race_name")
-                    rows.append((wk, name, date_s, net, st))
-                conn=get_conn(); c=conn.cursor()
-                for wk, name, date_s, net, st in rows:
-                    c.execute("REPLACE INTO schedule (week, race_name, race_date, tv_network, start_time) VALUES (?,?,?,?,?)",
-                              (wk, name, date_s, net, st))
-                conn.commit(); conn.close()
-                message=f"Imported {len(rows)} schedule entries."
+                count, errors = bulk_import(c, source, ["week", "race_name"], schedule_row,
+                    """INSERT INTO schedule (week, race_name, race_date, tv_network, start_time) VALUES (?,?,?,?,?)
+                       ON CONFLICT(week) DO UPDATE SET race_name=excluded.race_name, race_date=excluded.race_date,
+                       tv_network=excluded.tv_network, start_time=excluded.start_time""")
+                if errors:
+                    conn.rollback()
+                    message=f"Nothing imported: {len(errors)} invalid row(s)."
+                else:
+                    conn.commit()
+                    invalidate_week_cache()
+                    page_cache.invalidate()
+                    message=f"Imported {count} schedule entries."
             except Exception as e:
                 message=f"Failed to import: {e}"
+            finally:
+                conn.close()
     sched = list_schedule()
-    return render_template("admin_schedule.html", schedule=sched, message=message)
+    return render_template("admin_schedule.html", schedule=sched, message=message, errors=errors)
 
 @app.route("/admin_qualifying", methods=["GET","POST"])
 def admin_qualifying():
     if not session.get("is_admin"): return "Unauthorized",403
-    message=None
+    message=None; errors=[]
     if request.method=="POST":
         week_str = request.form.get("week","").strip()
-        csv_text = request.form.get("csv_text","").strip()
+        source = csv_upload()
         if not week_str.isdigit():
             message="Enter a valid week number."
-        elif not csv_text:
-            message="Paste CSV with headers: position,driver"
+        elif source is None:
+            message="Paste or upload CSV with headers: position,driver"
         else:
             week = int(week_str)
+            conn=get_conn(); c=conn.cursor()
             try:
-                reader = csv.DictReader(StringIO(csv_text))
-                conn=get_conn(); c=conn.cursor()
                 c.execute("DELETE FROM qualifying WHERE week=?", (week,))
-                count=0
-                for row in reader:
-                    pos = int(row.get("position","").strip())
-                    drv = row.get("driver","").strip()
-                    c.execute("INSERT OR REPLACE INTO qualifying (week, position, driver) VALUES (?,?,?)", (week, pos, drv))
-                    count+=1
-                conn.commit(); conn.close()
-                message=f"Loaded {count} qualifying spots for week {week}."
+                count, errors = bulk_import(c, source, ["position", "driver"], qualifying_row,
+                    """INSERT INTO qualifying (week, position, driver) VALUES (?,?,?)
+                       ON CONFLICT(week, position) DO UPDATE SET driver=excluded.driver""", extra=(week,))
+                if errors:
+                    conn.rollback()
+                    message=f"Nothing imported: {len(errors)} invalid row(s)."
+                else:
+                    conn.commit()
+                    page_cache.invalidate("lobby")
+                    message=f"Loaded {count} qualifying spots for week {week}."
             except Exception as e:
                 message=f"Failed to import: {e}"
+            finally:
+                conn.close()
     sched = list_schedule()
-    return render_template("admin_qualifying.html", schedule=sched, message=message)
+    return render_template("admin_qualifying.html", schedule=sched, message=message, errors=errors)
+
+@app.route("/admin_results", methods=["GET","POST"])
+def admin_results():
+    if not session.get("is_admin"): return "Unauthorized",403
+    message=None; errors=[]
+    if request.method=="POST":
+        week_str = request.form.get("week","").strip()
+        source = csv_upload()
+        if not week_str.isdigit():
+            message="Enter a valid week number."
+        elif source is None:
+            message="Paste or upload CSV with headers: position,driver (and optionally points)"
+        else:
+            week = int(week_str)
+            conn=get_conn(); c=conn.cursor()
+            try:
+                c.execute("DELETE FROM results WHERE week=?", (week,))
+                count, errors = bulk_import(c, source, ["position", "driver"], results_row,
+                    """INSERT INTO results (week, position, driver, points) VALUES (?,?,?,?)
+                       ON CONFLICT(week, position) DO UPDATE SET driver=excluded.driver, points=excluded.points""", extra=(week,))
+                if errors:
+                    conn.rollback()
+                    message=f"Nothing imported: {len(errors)} invalid row(s)."
+                else:
+                    score_week(c, week)
+                    conn.commit()
+                    page_cache.invalidate("standings")
+                    message=f"Loaded {count} results for week {week} and updated standings."
+            except Exception as e:
+                message=f"Failed to import: {e}"
+            finally:
+                conn.close()
+    return render_template("admin_results.html", message=message, errors=errors)
+
+@app.route("/standings")
+def standings():
+    def render():
+        conn=get_conn(); c=conn.cursor()
+        c.execute("SELECT username, points, weeks FROM standings WHERE weeks > 0 ORDER BY points DESC, username")
+        rows=c.fetchall(); conn.close()
+        return render_template("standings.html", standings=rows)
+    return cached_page("standings", (), ["standings"], render)
 
 @app.route("/lobby")
 def lobby():
     week_param = request.args.get("week","").strip()
     week = int(week_param) if week_param.isdigit() else autodetect_current_week()
-    sched = get_schedule_entry(week)
-    conn=get_conn(); c=conn.cursor()
-    c.execute("SELECT position, driver FROM qualifying WHERE week=? ORDER BY position ASC", (week,))
-    grid = c.fetchall(); conn.close()
-    return render_template("lobby.html", week=week, sched=sched, grid=grid)
+    def render():
+        sched = get_schedule_entry(week)
+        conn=get_conn(); c=conn.cursor()
+        c.execute("SELECT position, driver FROM qualifying WHERE week=? ORDER BY position ASC", (week,))
+        grid = c.fetchall(); conn.close()
+        return render_template("lobby.html", week=week, sched=sched, grid=grid)
+    return cached_page("lobby", (week, bool(session.get("is_admin"))), ["schedule", "qualifying"], render)
 
 @app.route("/admin_order", methods=["GET","POST"])
 def admin_order():
@@ -436,6 +3008,7 @@ def admin_order():
             week = current_week
         raw = request.form.get("order","").strip()
         order = [x.strip() for x in raw.split(",") if x.strip()]
+        secs = request.form.get("pick_seconds","").strip()
         valid = {u['username'] for u in list_users()}
         if not order:
             message="Please enter a comma-separated list of usernames."
@@ -443,8 +3016,13 @@ def admin_order():
             message=f"Unknown username; valid: {', '.join(sorted(valid))}"
         elif len(order) != len(valid):
             message=f"Include each user exactly once: {', '.join(sorted(valid))}"
+        elif secs and not secs.isdigit():
+            message="Seconds per pick must be a whole number (0 for no clock)."
+        elif request.form.get("action")=="reorder":
+            message = reorder_draft(week, order)
+            if not message: return redirect(url_for("draft", week=week))
         else:
-            create_draft(week, order)
+            create_draft(week, order, pick_seconds=int(secs or 0))
             return redirect(url_for("draft", week=week))
     d = get_draft(current_week)
     current_order = d["order"] if d else None
@@ -466,13 +3044,32 @@ def admin_reset_picks():
         else:
             week=int(wk)
             conn=get_conn(); c=conn.cursor()
+            v = next_draft_version(c)
             c.execute("DELETE FROM draft_picks WHERE week=?", (week,))
             c.execute("DELETE FROM drafts WHERE week=?", (week,))
             c.execute("DELETE FROM picks WHERE week=?", (week,))
+            score_week(c, week)
+            log_draft_event(c, week, v, "reset")
             conn.commit(); conn.close()
+            page_cache.invalidate("all_picks", "picks")
+            broadcaster.publish(week)
             done=True; message=f"Reset all picks and draft state for Week {week}."
     return render_template("admin_reset_picks.html", message=message, done=done)
 
+@app.route("/admin_undo_pick", methods=["GET","POST"])
+def admin_undo_pick():
+    if not session.get("is_admin"): return "Unauthorized",403
+    week_param = request.values.get("week","").strip()
+    week = int(week_param) if week_param.isdigit() else autodetect_current_week()
+    message=None
+    if request.method=="POST":
+        try:
+            round_no, username, driver = undo_last_pick(week)
+            message=f"Took back {username}'s round {round_no} pick ({driver})."
+        except ValueError as e:
+            message=str(e)
+    return render_template("admin_undo_pick.html", week=week, message=message, events=draft_events(week))
+
 @app.route("/draft", methods=["GET","POST"])
 def draft():
     if "username" not in session: return redirect(url_for("login"))
@@ -482,121 +3079,407 @@ def draft():
     d=get_draft(week)
     if not d:
         return redirect(url_for("lobby", week=week))
-    available=draft_available_drivers(week)
-    available=sorted(available, key=last_name_key)
-    my_picks=user_draft_picks(week, username)
-    on_the_clock=(d["order"][d["current_index"]] if d["current_round"]%2==1 else list(reversed(d["order"]))[d["current_index"]])
     if request.method=="POST":
         if d["status"]=="complete":
             return redirect(url_for("draft", week=week))
         custom = request.form.get("custom_driver","").strip()
         chosen = custom if custom else request.form.get("driver","").strip()
-        if custom:
-            conn=get_conn(); c=conn.cursor()
-            c.execute("INSERT OR IGNORE INTO drivers (name) VALUES (?)", (custom,))
-            conn.commit(); conn.close()
-        d=get_draft(week)
-        on_the_clock=(d["order"][d["current_index"]] if d["current_round"]%2==1 else list(reversed(d["order"]))[d["current_index"]])
-        if username!=on_the_clock: return "Not your turn.",403
-        avail_now = set(draft_available_drivers(week))
-        if chosen not in avail_now:
-            return "Driver not available.",400
-        add_draft_pick(week, d["current_round"], username, chosen)
-        advance_pointer(d)
-        d2=get_draft(week)
-        if d2["status"]=="complete":
-            consolidate_to_picks(week)
+        rnd = request.form.get("round","").strip(); idx = request.form.get("index","").strip()
+        expect = (int(rnd), int(idx)) if rnd.isdigit() and idx.isdigit() else None
+        err = submit_pick(week, username, chosen, custom=bool(custom), expect=expect)
+        if err: return err
         return redirect(url_for("draft", week=week))
+    available=draft_available_drivers(week)
+    my_picks=user_draft_picks(week, username)
+    on_the_clock=on_the_clock_for(d)
+    pick_queue=get_pick_queue(week, username)
     sched = get_schedule_entry(week)
     schedule_list = list_schedule()
     is_my_turn=(username==on_the_clock)
-    return render_template("draft.html", draft=d, available=available, my_picks=my_picks,
+    return render_template("draft.html", draft=d, available=available, my_picks=my_picks, pick_queue=pick_queue,
                            username=username, is_my_turn=is_my_turn, on_the_clock=on_the_clock,
-                           sched=sched, schedule_list=schedule_list, current_week=week, rounds_total=ROUNDS_TOTAL)
+                           sched=sched, schedule_list=schedule_list, current_week=week, rounds_total=ROUNDS_TOTAL,
+                           stream_url=DRAFT_STREAM_ORIGIN + request.script_root + "/draft_stream")
+
+@app.route("/draft_queue", methods=["POST"])
+def draft_queue():
+    if "username" not in session: return redirect(url_for("login"))
+    week_param=request.args.get("week","").strip()
+    week=int(week_param) if week_param.isdigit() else autodetect_current_week()
+    drivers=[line.strip() for line in request.form.get("queue","").splitlines()]
+    err=set_pick_queue(week, session["username"], drivers)
+    if err: return err, 400
+    return redirect(url_for("draft", week=week))
+
+def no_store(resp):
+    resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    resp.headers['Pragma'] = 'no-cache'
+    return resp
+
+def draft_etag(week, version, compact=False):
+    return f"{'c' if compact else 'd'}{week}-{version}"
 
 @app.route("/draft_state")
 def draft_state():
     week_param = request.args.get("week","").strip()
     week = int(week_param) if week_param.isdigit() else autodetect_current_week()
-    d = get_draft(week)
-    if not d:
-        resp = make_response(jsonify({"error":"no_draft"}), 404)
-        resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        resp.headers['Pragma'] = 'no-cache'
+    v = get_draft_version(week)
+    if not v:
+        return no_store(make_response(jsonify({"error":"no_draft"}), 404))
+    version, base_version = v
+    compact = request.args.get("compact") == "1"
+    etag = draft_etag(week, version, compact)
+    if request.if_none_match.contains(etag):
+        resp = no_store(make_response("", 304))
+        resp.set_etag(etag)
         return resp
 
-    conn=get_conn(); c=conn.cursor()
-    c.execute("SELECT round, username, driver, ts FROM draft_picks WHERE week=? ORDER BY round ASC, ts ASC, id ASC", (week,))
-    picks_rows=c.fetchall()
-    conn.close()
-
-    picks=[{"round":r, "username":u, "driver":dr, "ts":ts} for (r,u,dr,ts) in picks_rows]
-
-    grid = {}
+    d = get_draft(week)
+    if not d:
+        return no_store(make_response(jsonify({"error":"no_draft"}), 404))
     order = d["order"]
-    for u in order:
-        grid[u] = {i: "" for i in range(1, d["rounds_total"]+1)}
-    for p in picks:
-        grid[p["username"]][p["round"]] = p["driver"]
-
-    on_the_clock = (order[d["current_index"]] if d["current_round"]%2==1 else list(reversed(order))[d["current_index"]])
-    available = draft_available_drivers(week)
-    available = sorted(available, key=last_name_key)
-
+    on_the_clock = on_the_clock_for(d)
     payload = {
         "week": week,
+        "version": d["version"],
         "status": d["status"],
         "current_round": d["current_round"],
         "current_index": d["current_index"],
         "on_the_clock": on_the_clock,
-        "order": order,
-        "rounds_total": d["rounds_total"],
-        "picks": picks,
-        "grid": grid,
-        "available": available
+        "pick_seconds": d["pick_seconds"],
+        "clock_remaining": draft_clock.remaining(d["clock_deadline"]) if d["status"]=="active" else None,
     }
+
+    since_param = request.args.get("since","").strip()
+    since = int(since_param) if since_param.isdigit() else None
+    if compact:
+        return compact_draft_state(week, d, payload, since)
+    conn=get_conn(); c=conn.cursor()
+    if since is not None and d["base_version"] <= since <= d["version"]:
+        # The client already holds this draft up to `since`; send only what changed.
+        c.execute("SELECT round, username, driver, ts FROM draft_picks WHERE week=? AND version>? ORDER BY round ASC, ts ASC, id ASC", (week, since))
+        picks_rows=c.fetchall(); conn.close()
+        payload["delta"] = True
+        payload["picks"] = [{"round":r, "username":u, "driver":dr, "ts":ts} for (r,u,dr,ts) in picks_rows]
+        payload["removed"] = [dr for (_,_,dr,_) in picks_rows]
+    else:
+        c.execute("SELECT round, username, driver, ts FROM draft_picks WHERE week=? ORDER BY round ASC, ts ASC, id ASC", (week,))
+        picks_rows=c.fetchall(); conn.close()
+        picks=[{"round":r, "username":u, "driver":dr, "ts":ts} for (r,u,dr,ts) in picks_rows]
+        grid = {}
+        for u in order:
+            grid[u] = {i: "" for i in range(1, d["rounds_total"]+1)}
+        for p in picks:
+            grid[p["username"]][p["round"]] = p["driver"]
+        available = draft_available_drivers(week)
+        payload.update({
+            "delta": False,
+            "order": order,
+            "rounds_total": d["rounds_total"],
+            "picks": picks,
+            "grid": grid,
+            "available": available
+        })
     resp = make_response(jsonify(payload))
-    resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    resp.headers['Pragma'] = 'no-cache'
+    resp.set_etag(draft_etag(week, d["version"]))
+    resp.headers['Cache-Control'] = 'no-cache, must-revalidate, max-age=0'
+    return resp
+
+def compact_draft_state(week, d, payload, since):
+    """/draft_state?compact=1: driver ids instead of names, the grid as
+    round arrays, and the driver dictionary only when the client's `dict`
+    doesn't match. A delta lists just the cells picked after `since`."""
+    delta = since is not None and d["base_version"] <= since <= d["version"]
+    dict_id, names_json, grid_json, cells = draft_grid(week, d, since if delta else None)
+    payload.update(compact=True, dict=dict_id)
+    encoded = {}
+    if request.args.get("dict") != dict_id:
+        delta = False
+        encoded["drivers"] = names_json
+    if delta:
+        payload.update(delta=True, cells=cells)
+    else:
+        payload.update(delta=False, order=d["order"], rounds_total=d["rounds_total"])
+        encoded["grid"] = grid_json
+    resp = make_response(compact_json(payload, **encoded))
+    resp.mimetype = "application/json"
+    resp.set_etag(draft_etag(week, d["version"], True))
+    resp.headers['Cache-Control'] = 'no-cache, must-revalidate, max-age=0'
+    return resp
+
+# Each open stream holds one gunicorn thread for as long as the tab is open,
+# so a worker only serves STREAM_MAX_PER_WORKER of them. The rest get a 503,
+# which closes their EventSource, and draft.html falls back to polling.
+stream_slots = threading.BoundedSemaphore(max(STREAM_MAX_PER_WORKER, 1))
+
+@app.route("/draft_stream")
+def draft_stream():
+    if request.method == "HEAD":
+        resp = no_store(Response("", mimetype="text/event-stream"))
+        resp.headers['X-Accel-Buffering'] = 'no'
+        return resp
+    if STREAM_MAX_PER_WORKER <= 0 or not stream_slots.acquire(blocking=False):
+        resp = no_store(make_response("", 503))
+        resp.headers['Retry-After'] = '30'
+        return resp
+    try:
+        resp = stream_response()
+    except BaseException:
+        stream_slots.release()
+        raise
+    resp.call_on_close(stream_slots.release)
+    return resp
+
+def stream_response():
+    week_param = request.args.get("week","").strip()
+    week = int(week_param) if week_param.isdigit() else autodetect_current_week()
+    events = queue.Queue()
+    callback = events.put
+    path = db_path()  # the generator outlives the request context
+    broadcaster.subscribe(week, callback, path)
+    try:
+        conn=get_conn()
+        try:
+            first = draft_signature(conn, week)
+        finally:
+            conn.close()
+    except BaseException:
+        broadcaster.unsubscribe(week, callback, path)
+        raise
+
+    def generate():
+        yield "retry: 3000\n\n"
+        yield sse_event("draft", first)
+        while True:
+            try:
+                sig = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event("draft", sig)
+
+    resp = no_store(Response(generate(), mimetype="text/event-stream"))
+    resp.headers['X-Accel-Buffering'] = 'no'
+    # On close rather than in generate(): a body that is never read never
+    # runs the generator's finally.
+    resp.call_on_close(lambda: broadcaster.unsubscribe(week, callback, path))
     return resp
 
+# --- exports ---
+# Each ORDER BY matches an index, so SQLite walks rows in order without
+# sorting and the first bytes go out before the last row is read. On
+# PostgreSQL a server-side cursor keeps memory flat the same way.
+EXPORTS = {
+    "picks": (["week", "username", "driver1", "driver2", "driver3", "driver4", "driver5", "driver6"], "week, username, id"),
+    "draft_picks": (["week", "round", "username", "driver", "ts", "auto"], "week, round, id"),
+    "schedule": (["week", "race_name", "race_date", "tv_network", "start_time"], "week"),
+    "qualifying": (["week", "position", "driver"], "week, position"),
+}
+EXPORT_BATCH_ROWS = 500
+
+def export_rows(path, table, first, last):
+    """Yield batches of rows for one table and week range, holding one cursor."""
+    columns, order = EXPORTS[table]
+    conn = get_pool(path).acquire()
+    try:
+        c = conn.stream_cursor()
+        c.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE week BETWEEN ? AND ? ORDER BY {order}", (first, last))
+        while True:
+            rows = c.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows: break
+            yield rows
+    finally:
+        conn.close()
+
+def export_chunks(batches, columns, fmt):
+    if fmt == "csv":
+        out = StringIO(); w = csv.writer(out)
+        w.writerow(columns)
+        for rows in batches:
+            w.writerows(rows)
+            yield out.getvalue()
+            out.seek(0); out.truncate()
+        yield out.getvalue()
+    else:
+        sep = "[\n"
+        for rows in batches:
+            parts = []
+            for r in rows:
+                parts.append(sep + json.dumps(dict(zip(columns, r))))
+                sep = ",\n"
+            yield "".join(parts)
+        yield "[]\n" if sep == "[\n" else "\n]\n"
+
+def gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8"))
+        if data: yield data
+    yield z.flush()
+
+@app.route("/export/<table>")
+def export(table):
+    if "username" not in session: return redirect(url_for("login"))
+    if table not in EXPORTS: abort(404)
+    fmt = request.args.get("format", "csv").strip().lower()
+    if fmt not in ("csv", "json"):
+        return "Use format=csv or format=json.", 400
+    first = request.args.get("from", "").strip(); last = request.args.get("to", "").strip()
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return "from and to must be week numbers.", 400
+    first = int(first) if first else 0
+    last = int(last) if last else 2**31
+    chunks = export_chunks(export_rows(db_path(), table, first, last), EXPORTS[table][0], fmt)
+    gz = request.accept_encodings["gzip"] > 0
+    resp = Response(gzip_chunks(chunks) if gz else chunks,
+                    mimetype="text/csv" if fmt == "csv" else "application/json")
+    if gz: resp.headers["Content-Encoding"] = "gzip"
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Content-Disposition"] = f"attachment; filename={table}.{fmt}"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return no_store(resp)
+
 @app.route("/all_picks")
 def all_picks():
     week_param = request.args.get("week","").strip()
     week = int(week_param) if week_param.isdigit() else autodetect_current_week()
-    conn=get_conn(); c=conn.cursor()
-    c.execute("SELECT DISTINCT week FROM picks ORDER BY week")
-    weeks = [r[0] for r in c.fetchall()]
-    if week not in weeks and weeks:
-        week = weeks[-1]
-    c.execute("""SELECT username, driver1, driver2, driver3, driver4, driver5, driver6
-                 FROM picks WHERE week=? ORDER BY username""", (week,))
-    rows=c.fetchall(); conn.close()
-    sched = get_schedule_entry(week)
-    return render_template("all_picks.html", week=week, weeks=weeks, picks=rows, sched=sched)
+    def render():
+        wk = week
+        conn=get_conn(); c=conn.cursor()
+        c.execute("SELECT DISTINCT week FROM picks ORDER BY week")
+        weeks = [r[0] for r in c.fetchall()]
+        if wk not in weeks and weeks:
+            wk = weeks[-1]
+        c.execute("""SELECT username, driver1, driver2, driver3, driver4, driver5, driver6
+                     FROM picks WHERE week=? ORDER BY username""", (wk,))
+        rows=c.fetchall(); conn.close()
+        sched = get_schedule_entry(wk)
+        return render_template("all_picks.html", week=wk, weeks=weeks, picks=rows, sched=sched)
+    return cached_page("all_picks", (week,), ["schedule", "picks"], render)
+
+# --- season analytics ---
+# Every section is one GROUP BY over whole tables, so the cost is a single
+# pass per table no matter how many weeks of history a league has.
+ANALYTICS = {
+    "drivers": (["driver", "times_rostered", "times_drafted", "avg_round", "best_round"],
+        """SELECT driver, SUM(CASE WHEN src=1 THEN 1 ELSE 0 END), SUM(CASE WHEN src=0 THEN 1 ELSE 0 END), ROUND(AVG(round), 2), MIN(round) FROM (
+               SELECT driver, round, 0 AS src FROM draft_picks
+               UNION ALL SELECT driver1, NULL, 1 FROM picks UNION ALL SELECT driver2, NULL, 1 FROM picks
+               UNION ALL SELECT driver3, NULL, 1 FROM picks UNION ALL SELECT driver4, NULL, 1 FROM picks
+               UNION ALL SELECT driver5, NULL, 1 FROM picks UNION ALL SELECT driver6, NULL, 1 FROM picks) AS rostered
+           GROUP BY driver ORDER BY 2 DESC, 3 DESC, driver"""),
+    "users": (["username", "weeks", "picks", "avg_round", "avg_overall_pick", "avg_draft_slot", "auto_picks"],
+        """SELECT username, COUNT(DISTINCT week), COUNT(*), ROUND(AVG(round), 2), ROUND(AVG(overall), 2),
+                  ROUND(AVG(CASE WHEN round=1 THEN overall END), 2), SUM(CASE WHEN auto > 0 THEN 1 ELSE 0 END) FROM (
+               SELECT username, week, round, auto,
+                      ROW_NUMBER() OVER (PARTITION BY week ORDER BY round, ts, id) AS overall
+               FROM draft_picks) AS numbered
+           GROUP BY username ORDER BY username"""),
+    "qualifying": (["position", "picks", "avg_round", "best_round", "worst_round"],
+        """SELECT q.position, COUNT(*), ROUND(AVG(dp.round), 2), MIN(dp.round), MAX(dp.round)
+           FROM qualifying q JOIN draft_picks dp ON dp.week=q.week AND dp.driver=q.driver
+           GROUP BY q.position ORDER BY q.position"""),
+}
+ANALYTICS_TABLES = ["draft_picks", "picks", "qualifying"]
+
+def qualifying_round_correlation(c):
+    # Pearson's r between qualifying position and draft round, from one pass of sums.
+    c.execute("""SELECT COUNT(*), SUM(q.position), SUM(dp.round), SUM(q.position*q.position),
+                        SUM(dp.round*dp.round), SUM(q.position*dp.round)
+                 FROM qualifying q JOIN draft_picks dp ON dp.week=q.week AND dp.driver=q.driver""")
+    n, sx, sy, sxx, syy, sxy = c.fetchone()
+    if not n: return None
+    var = (n*sxx - sx*sx) * (n*syy - sy*sy)
+    return round((n*sxy - sx*sy) / var**0.5, 4) if var > 0 else None
+
+def season_analytics(c, sections):
+    out = {}
+    for name in sections:
+        columns, sql = ANALYTICS[name]
+        c.execute(sql)
+        out[name] = {"columns": columns, "rows": c.fetchall()}
+    return out
+
+@app.route("/analytics")
+def analytics():
+    fmt = request.args.get("format", "json").strip().lower()
+    section = request.args.get("section", "").strip().lower()
+    if fmt not in ("json", "csv") or (section and section not in ANALYTICS):
+        return f"Use format=json|csv and section={'|'.join(ANALYTICS)}.", 400
+    if fmt == "csv" and not section:
+        return "CSV needs a section: " + ", ".join(ANALYTICS), 400
+    sections = [section] if section else list(ANALYTICS)
+    def render():
+        conn=get_conn(); c=conn.cursor()
+        data = season_analytics(c, sections)
+        if fmt == "json":
+            if "qualifying" in data:
+                data["qualifying"]["round_correlation"] = qualifying_round_correlation(c)
+            conn.close()
+            return json.dumps(data)
+        conn.close()
+        out = StringIO(); w = csv.writer(out)
+        w.writerow(data[section]["columns"]); w.writerows(data[section]["rows"])
+        return out.getvalue()
+    resp = cached_page("analytics", (fmt, section), ANALYTICS_TABLES, render,
+                       mimetype="application/json" if fmt == "json" else "text/csv")
+    if fmt == "csv":
+        resp.headers["Content-Disposition"] = f"attachment; filename=analytics_{section}.csv"
+    return resp
 
 @app.route("/picks")
 def view_picks():
     week_param=request.args.get("week","").strip()
     week=int(week_param) if week_param.isdigit() else autodetect_current_week()
-    conn=get_conn(); c=conn.cursor()
-    c.execute("""SELECT username,driver1,driver2,driver3,driver4,driver5,driver6
-                 FROM picks WHERE week=? ORDER BY username""", (week,))
-    rows=c.fetchall(); conn.close()
-    sched = get_schedule_entry(week)
-    return render_template("picks.html", picks=rows, week=week, sched=sched)
+    def render():
+        conn=get_conn(); c=conn.cursor()
+        c.execute("""SELECT username,driver1,driver2,driver3,driver4,driver5,driver6
+                     FROM picks WHERE week=? ORDER BY username""", (week,))
+        rows=c.fetchall(); conn.close()
+        sched = get_schedule_entry(week)
+        return render_template("picks.html", picks=rows, week=week, sched=sched)
+    return cached_page("picks", (week,), ["schedule", "picks"], render)
 
 @app.route("/schedule")
 def schedule_page():
-    sched = list_schedule()
-    return render_template("schedule.html", schedule=sched)
+    return cached_page("schedule", (), ["schedule"], lambda: render_template("schedule.html", schedule=list_schedule()))
+
+@app.route("/admin_db_stats")
+def admin_db_stats():
+    if not session.get("is_admin"): return "Unauthorized", 403
+    return jsonify({"pools": pool_stats(), "stream_viewers": broadcaster.viewer_count(),
+                    "page_cache": page_cache.stats(), "query_plans": explain_hot_queries()})
+
+@app.route("/metrics")
+def metrics_page():
+    if METRICS_TOKEN and not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return "Unauthorized", 401
+    w = os.getpid()
+    pc = page_cache.stats()
+    lines = metrics.render(extra_caches=[("page", (pc["hits"], pc["misses"]))])
+    lines += ["# HELP picks_draft_viewers Open /draft_stream connections.", "# TYPE picks_draft_viewers gauge",
+              f"picks_draft_viewers{prom_labels(worker=w)} {broadcaster.viewer_count()}",
+              "# HELP picks_db_connections Pooled SQLite connections, by database and state.", "# TYPE picks_db_connections gauge"]
+    for path, p in sorted(pool_stats().items()):
+        for state in ("in_use", "idle"):
+            lines.append(f"picks_db_connections{prom_labels(db=os.path.basename(path), state=state, worker=w)} {p[state]}")
+    return Response("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.route("/admin_backup")
 def admin_backup():
     if not session.get("is_admin"): return "Unauthorized", 403
-    if not os.path.exists(DB_PATH):
+    if not storage.backups:
+        return "Backups of the shared database are taken with pg_dump.", 501
+    path = db_path()
+    if not os.path.exists(path):
         return "No database found.", 404
-    return send_file(DB_PATH, as_attachment=True, download_name=os.path.basename(DB_PATH))
+    snap = latest_backup(path)
+    if snap is None or request.args.get("fresh") == "1":
+        snap = take_backup(path)
+    resp = send_file(os.path.abspath(snap), as_attachment=True, download_name=os.path.basename(snap),
+                     mimetype="application/gzip")
+    resp.headers["X-Checksum-SHA256"] = backup_checksum(snap) or ""
+    return resp
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5000"))
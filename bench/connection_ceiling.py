@@ -0,0 +1,154 @@
+"""How many live draft viewers can one deployment hold?
+
+Opens N concurrent /draft_stream connections, counts how many receive their
+first event within the timeout, and while they are all held open measures
+the latency of ordinary /draft_state polls.
+
+    # against servers you started yourself
+    python bench/connection_ceiling.py --url http://127.0.0.1:5000 --streams 500
+
+    # or let it seed a scratch database and compare gunicorn with draft_async.py
+    python bench/connection_ceiling.py --spawn --streams 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def open_stream(host, port, week, timeout, held):
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.write(f"GET /draft_stream?week={week} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    try:
+        buf = b""
+        deadline = time.monotonic() + timeout
+        while b"event: draft" not in buf:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise asyncio.TimeoutError
+            chunk = await asyncio.wait_for(reader.read(4096), left)
+            if not chunk:
+                raise ConnectionError
+            buf += chunk
+    except (OSError, ConnectionError, asyncio.TimeoutError):
+        writer.close()
+        return False
+    held.append(writer)
+    return True
+
+async def poll(host, port, week, timeout):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(f"GET /draft_state?week={week} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None
+    if b" 200 " not in status:
+        return None
+    return (time.perf_counter() - start) * 1000
+
+async def measure(url, week, streams, polls, timeout):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    held = []
+    sem = asyncio.Semaphore(200)  # pace connection setup, not the number held
+    async def one():
+        async with sem:
+            return await open_stream(host, port, week, timeout, held)
+    results = await asyncio.gather(*(one() for _ in range(streams)))
+    latencies = await asyncio.gather(*(poll(host, port, week, timeout) for _ in range(polls)))
+    for w in held:
+        w.close()
+    ok = [l for l in latencies if l is not None]
+    return {
+        "streams_ok": sum(results),
+        "streams": streams,
+        "polls_ok": len(ok),
+        "polls": polls,
+        "poll_p50_ms": statistics.median(ok) if ok else None,
+        "poll_max_ms": max(ok) if ok else None,
+    }
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, proc, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), 0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def seed(scratch, week):
+    # Keep everything the servers write (database, leagues, backups) in scratch.
+    env = dict(os.environ, DB_PATH=os.path.join(scratch, "ceiling.db"), LEAGUES_DIR=os.path.join(scratch, "leagues"),
+               BACKUP_DIR=os.path.join(scratch, "backups"), BACKUP_INTERVAL_SECONDS="0")
+    code = f"import app; app.create_draft({week}, ['Matt','Mark','Bob','Bill'])"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+    return env
+
+def spawn_and_measure(args):
+    env = seed(tempfile.mkdtemp(), args.week)
+    servers = [
+        ("gunicorn (Procfile settings)", lambda port: ["gunicorn", "app:app", "-c", "gunicorn.conf.py",
+                                                         "--bind", f"127.0.0.1:{port}", "--workers", "2", "--threads", "16"]),
+        ("draft_async.py", lambda port: [sys.executable, "draft_async.py", "--host", "127.0.0.1", "--port", str(port)]),
+    ]
+    rows = []
+    for name, cmd in servers:
+        port = free_port()
+        proc = subprocess.Popen(cmd(port), cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port, proc)
+            rows.append((name, asyncio.run(measure(f"http://127.0.0.1:{port}", args.week, args.streams, args.polls, args.timeout))))
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"{name}: skipped ({e})")
+        finally:
+            proc.terminate()
+            proc.wait()
+    return rows
+
+def report(rows):
+    print(f"{'server':32} {'streams held':>14} {'polls ok':>10} {'poll p50 ms':>12} {'poll max ms':>12}")
+    for name, r in rows:
+        p50 = f"{r['poll_p50_ms']:.1f}" if r["poll_p50_ms"] is not None else "-"
+        pmax = f"{r['poll_max_ms']:.1f}" if r["poll_max_ms"] is not None else "-"
+        print(f"{name:32} {r['streams_ok']:>6}/{r['streams']:<7} {r['polls_ok']:>4}/{r['polls']:<5} {p50:>12} {pmax:>12}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", help="server to measure; repeat to compare several")
+    parser.add_argument("--spawn", action="store_true", help="start gunicorn and draft_async.py on a scratch database")
+    parser.add_argument("--week", type=int, default=1)
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    if args.spawn or not args.url:
+        rows = spawn_and_measure(args)
+    else:
+        rows = [(u, asyncio.run(measure(u, args.week, args.streams, args.polls, args.timeout))) for u in args.url]
+    report(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Load test for the draft hot path.
+
+Seeds a scratch database (users, drivers, weeks of history, leagues), then
+runs one live snake draft per league: every drafter polls /draft_state and
+POSTs /draft when on the clock, while extra pollers refresh /draft_state the
+way open browser tabs do. Reports throughput, p50/p99 latency and errors per
+route, including "database is locked" failures logged by the server.
+
+    # in process, through the Flask test client (server and load share a GIL)
+    python bench/draft_load.py --users 12 --pollers 20
+
+    # against gunicorn, to size workers and threads
+    python bench/draft_load.py --gunicorn --workers 2 --threads 16 --pollers 200 --leagues 4
+
+    # machine-readable, failing on any lock error (for CI)
+    python bench/draft_load.py --json --max-lock-errors 0
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+from connection_ceiling import ROOT, free_port, wait_for_port
+
+PASSWORD = "bench-password"
+LOCKED = "database is locked"
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}   # route -> [latency ms]
+        self.errors = {}    # route -> count of 5xx / transport failures
+        self.picks = 0
+
+    def record(self, route, ms, ok):
+        with self.lock:
+            self.samples.setdefault(route, []).append(ms)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+class ClientTransport:
+    """One logged-in browser, served in process by the Flask test client."""
+    def __init__(self, app, base):
+        self.client = app.test_client()
+        self.base = base
+
+    def request(self, method, path, data=None, headers=None):
+        r = self.client.open(self.base + path, method=method, data=data, headers=headers or {})
+        return r.status_code, r.get_data(), r.headers
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class HTTPTransport:
+    """One logged-in browser talking to a real server over HTTP."""
+    def __init__(self, url, base):
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect)
+        self.prefix = url.rstrip("/") + base
+
+    def request(self, method, path, data=None, headers=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.prefix + path, data=body, method=method, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=30) as r:
+                return r.status, r.read(), r.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers
+
+def timed_request(stats, route, transport, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        status, body, headers = transport.request(method, path, **kwargs)
+    except OSError:
+        stats.record(route, (time.perf_counter() - start) * 1000, False)
+        return None, b"", {}
+    stats.record(route, (time.perf_counter() - start) * 1000, status < 500)
+    return status, body, headers
+
+def seed(app, args):
+    """Create the leagues, users, drivers and schedule; returns [(league, users)]."""
+    from werkzeug.security import generate_password_hash
+    users = [f"user{i:03d}" for i in range(1, args.users + 1)]
+    drivers = [f"Bench Driver {i:03d}" for i in range(1, args.drivers + 1)]
+    ph = generate_password_hash(PASSWORD, method=app.PASSWORD_HASH_METHOD)
+    leagues = [None] + [f"bench{i}" for i in range(1, args.leagues)]
+    start = date.today() - timedelta(weeks=args.weeks - 1)
+    for league in leagues:
+        if league:
+            app.create_league(league, admin="benchadmin")
+        with app.use_db(app.league_db_path(league) if league else app.DB_PATH):
+            conn = app.get_conn(); c = conn.cursor()
+            c.executemany("INSERT OR REPLACE INTO users (username, password_hash, is_admin, must_change_pw) VALUES (?,?,0,0)",
+                          [(u, ph) for u in users])
+            c.execute("DELETE FROM drivers")
+            c.executemany("INSERT INTO drivers (name) VALUES (?)", [(d,) for d in drivers])
+            c.executemany("INSERT OR REPLACE INTO schedule (week, race_name, race_date) VALUES (?,?,?)",
+                          [(w, f"Bench Race {w}", (start + timedelta(weeks=w - 1)).isoformat()) for w in range(1, args.weeks + 1)])
+            # Completed drafts for every earlier week, so tables have a season of history.
+            for week in range(1, args.weeks):
+                v = app.next_draft_version(c)
+                c.execute("""REPLACE INTO drafts (week,order_csv,current_round,current_index,rounds_total,status,version,base_version)
+                             VALUES (?,?,?,?,?,'complete',?,?)""", (week, ",".join(users), app.ROUNDS_TOTAL, 0, app.ROUNDS_TOTAL, v, v))
+                rows = []
+                for rnd in range(1, app.ROUNDS_TOTAL + 1):
+                    seq = users if rnd % 2 else users[::-1]
+                    for i, u in enumerate(seq):
+                        rows.append((week, rnd, u, drivers[((rnd - 1) * len(users) + i + week) % len(drivers)], v))
+                c.executemany("INSERT INTO draft_picks (week, round, username, driver, version) VALUES (?,?,?,?,?)", rows)
+                app.consolidate_week(c, week)
+            conn.commit(); conn.close()
+            app.create_draft(args.weeks, users)
+    return [(league, users) for league in leagues]
+
+def login(transport, user, stats):
+    # The server caps concurrent password hashing and answers 503 when busy.
+    while True:
+        status, _, headers = timed_request(stats, "POST /", transport, "POST", "/", data={"username": user, "password": PASSWORD})
+        if status == 302: return
+        time.sleep(float(headers.get("Retry-After", "1")) if status == 503 else 1)
+
+def drafter(transport, user, week, stats, args):
+    login(transport, user, stats)
+    while True:
+        status, body, _ = timed_request(stats, "GET /draft_state", transport, "GET", f"/draft_state?week={week}")
+        if status != 200:
+            time.sleep(args.think); continue
+        state = json.loads(body)
+        if state["status"] == "complete":
+            return
+        if state["on_the_clock"] != user:
+            time.sleep(args.think); continue
+        form = {"driver": state["available"][0], "round": state["current_round"], "index": state["current_index"]}
+        status, _, headers = timed_request(stats, "POST /draft", transport, "POST", f"/draft?week={week}", data=form)
+        if status == 302 and "/draft" in headers.get("Location", ""):
+            with stats.lock: stats.picks += 1
+        elif status == 302:
+            login(transport, user, stats)
+
+def poller(transport, user, week, stats, args, done):
+    # Mirrors draft.html: compact conditional GETs, asking only for picks since
+    # the last version seen and for the driver dictionary only once.
+    login(transport, user, stats)
+    etag = None; version = None; dict_id = None
+    while not done.is_set():
+        path = f"/draft_state?compact=1&week={week}" + (f"&dict={dict_id}" if dict_id else "") + \
+               (f"&since={version}" if version is not None else "")
+        status, body, headers = timed_request(stats, "GET /draft_state (poll)", transport, "GET", path,
+                                              headers={"If-None-Match": etag} if etag else None)
+        if status == 200:
+            state = json.loads(body)
+            etag = headers.get("ETag"); version = state.get("version"); dict_id = state.get("dict")
+        time.sleep(args.poll_interval)
+
+def run_load(make_transport, drafts, args, stats):
+    week = args.weeks
+    done = threading.Event()
+    drafters = []; pollers = []
+    for league, users in drafts:
+        base = f"/l/{league}" if league else ""
+        for u in users:
+            drafters.append(threading.Thread(target=drafter, args=(make_transport(base), u, week, stats, args)))
+        for i in range(args.pollers):
+            pollers.append(threading.Thread(target=poller, args=(make_transport(base), users[i % len(users)], week, stats, args, done)))
+    for t in pollers + drafters: t.daemon = True; t.start()
+    start = time.perf_counter()
+    deadline = start + args.timeout
+    for t in drafters:
+        t.join(max(0.0, deadline - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in pollers: t.join(5)
+    return elapsed, any(t.is_alive() for t in drafters)
+
+class LockCounter(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        if LOCKED in record.getMessage() or (record.exc_info and LOCKED in str(record.exc_info[1])):
+            self.count += 1
+
+def report(stats, elapsed, timed_out, lock_errors, args):
+    rows = []
+    for route, samples in sorted(stats.samples.items()):
+        rows.append({"route": route, "requests": len(samples), "per_second": len(samples) / elapsed,
+                     "p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99), "max_ms": max(samples),
+                     "errors": stats.errors.get(route, 0)})
+    result = {"mode": "gunicorn" if args.gunicorn else "test-client", "elapsed_s": elapsed, "timed_out": timed_out,
+              "picks": stats.picks, "picks_per_second": stats.picks / elapsed, "lock_errors": lock_errors, "routes": rows}
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return result
+    print(f"{result['mode']}: {stats.picks} picks in {elapsed:.2f}s ({result['picks_per_second']:.1f}/s), "
+          f"{lock_errors} lock errors{', TIMED OUT' if timed_out else ''}")
+    print(f"{'route':28} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for r in rows:
+        print(f"{r['route']:28} {r['requests']:>9} {r['per_second']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['errors']:>7}")
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=12, help="drafters per league")
+    parser.add_argument("--drivers", type=int, default=80)
+    parser.add_argument("--weeks", type=int, default=10, help="weeks of schedule; all but the last get a finished draft")
+    parser.add_argument("--leagues", type=int, default=1, help="the default database plus leagues-1 extra leagues")
+    parser.add_argument("--pollers", type=int, default=20, help="extra /draft_state pollers per league")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--think", type=float, default=0.01, help="drafter sleep between polls while waiting")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--gunicorn", action="store_true", help="serve from a local gunicorn instead of the test client")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--max-lock-errors", type=int, default=None, help="exit non-zero above this many lock errors")
+    args = parser.parse_args(argv)
+    if args.drivers < args.users * 6:
+        parser.error("need at least 6 drivers per user")
+
+    scratch = tempfile.mkdtemp(prefix="draft-bench-")
+    env = {"DB_PATH": os.path.join(scratch, "bench.db"), "LEAGUES_DIR": os.path.join(scratch, "leagues"),
+           "BACKUP_DIR": os.path.join(scratch, "backups"), "BACKUP_INTERVAL_SECONDS": "0",
+           # A cheap hash: the benchmark measures drafting, not logins.
+           "PASSWORD_HASH_METHOD": os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")}
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    import app
+    drafts = seed(app, args)
+    stats = Stats()
+    if args.gunicorn:
+        port = free_port()
+        log = open(os.path.join(scratch, "gunicorn.log"), "w+")
+        proc = subprocess.Popen(["gunicorn", "app:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                                 "--workers", str(args.workers), "--threads", str(args.threads)],
+                                cwd=ROOT, env=dict(os.environ, **env), stdout=log, stderr=log)
+        try:
+            wait_for_port(port, proc)
+            elapsed, timed_out = run_load(lambda base: HTTPTransport(f"http://127.0.0.1:{port}", base), drafts, args, stats)
+        finally:
+            proc.terminate(); proc.wait()
+        log.seek(0)
+        lock_errors = log.read().count(LOCKED)
+    else:
+        counter = LockCounter()
+        app.app.logger.addHandler(counter)
+        elapsed, timed_out = run_load(lambda base: ClientTransport(app.app, base), drafts, args, stats)
+        lock_errors = counter.count
+    report(stats, elapsed, timed_out, lock_errors, args)
+    if timed_out or (args.max_lock_errors is not None and lock_errors > args.max_lock_errors):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
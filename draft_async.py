@@ -0,0 +1,217 @@
+"""Asyncio serving mode for the live draft pages.
+
+An ASGI application that runs next to the regular gunicorn app:
+
+    uvicorn draft_async:application --host 0.0.0.0 --port 8001
+    python draft_async.py --port 8001              # the same, via uvicorn.run
+
+Point DRAFT_STREAM_ORIGIN on the gunicorn app at this server (or route
+/draft_stream to it in a proxy) and draft.html opens its stream here.
+
+/draft_stream is served natively: each viewer is an idle coroutine waiting on
+the process's DraftBroadcaster, so one process can hold thousands of them.
+Every other path (/draft, /draft_state, ...) is handed to the Flask app on a
+bounded thread pool, so the blocking database calls never stall the event loop.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+
+import app as picks
+
+ASYNC_DB_THREADS = int(os.environ.get("ASYNC_DB_THREADS", "16"))
+ASYNC_MAX_BODY_BYTES = int(os.environ.get("ASYNC_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+executor = ThreadPoolExecutor(max_workers=ASYNC_DB_THREADS, thread_name_prefix="draft-db")
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1"); value = value.decode("latin-1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = environ[key] + "," + value if key in environ else value
+    return environ
+
+def start_flask(environ):
+    """Call the Flask app up to its first body chunk: (status, headers, body iterable)."""
+    captured = {}
+    def start_response(status, headers, exc_info=None):
+        captured["status"] = int(status.split(" ", 1)[0])
+        captured["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return lambda data: None
+    result = picks.app(environ, start_response)
+    return captured["status"], captured["headers"], result
+
+def close_result(result):
+    if hasattr(result, "close"): result.close()
+
+class BodyTooLarge(Exception):
+    pass
+
+async def read_body(receive):
+    body = bytearray()
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        if len(body) > ASYNC_MAX_BODY_BYTES:
+            raise BodyTooLarge
+        more = message.get("more_body", False)
+    return bytes(body)
+
+async def flask_bridge(scope, receive, send):
+    try:
+        body = await read_body(receive)
+    except BodyTooLarge:
+        await send({"type": "http.response.start", "status": 413, "headers": [(b"content-length", b"0")]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    loop = asyncio.get_running_loop()
+    status, headers, result = await loop.run_in_executor(executor, start_flask, wsgi_environ(scope, body))
+    try:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        # One chunk per executor call, so a streamed export goes out as it
+        # is produced instead of being joined in memory first.
+        chunks = iter(result)
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None: break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        await loop.run_in_executor(executor, close_result, result)
+
+def stream_start(path, week):
+    with picks.use_db(path):
+        picks.ensure_schema(path)
+        week = week if week is not None else picks.autodetect_current_week()
+        conn = picks.get_conn()
+        try:
+            return week, picks.draft_signature(conn, week)
+        finally:
+            conn.close()
+
+def stream_db_path(path):
+    """The database for a /draft_stream or /l/<league>/draft_stream path, else None."""
+    if path == "/draft_stream":
+        return picks.DB_PATH
+    parts = path.split("/")
+    if len(parts) == 4 and parts[1] == "l" and parts[3] == "draft_stream":
+        db = picks.league_db_path(parts[2])
+        if db and picks.storage.exists(db):
+            return db
+    return None
+
+async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+async def draft_stream(scope, receive, send, path):
+    week_param = parse_qs(scope["query_string"].decode("latin-1")).get("week", [""])[0].strip()
+    loop = asyncio.get_running_loop()
+    week, first = await loop.run_in_executor(executor, stream_start, path, int(week_param) if week_param.isdigit() else None)
+    events = asyncio.Queue()
+    def callback(sig):
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, sig)
+        except RuntimeError:
+            pass  # loop already closed
+    picks.broadcaster.subscribe(week, callback, path)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-store, no-cache, must-revalidate, max-age=0"),
+            (b"x-accel-buffering", b"no"),
+            # Pages on the gunicorn origin open this stream; it carries only
+            # the draft's version signature, so any origin may read it.
+            (b"access-control-allow-origin", b"*"),
+        ]})
+        first_chunk = "retry: 3000\n\n" + picks.sse_event("draft", first)
+        await send({"type": "http.response.body", "body": first_chunk.encode(), "more_body": True})
+        while True:
+            get = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({get, disconnect}, timeout=picks.STREAM_KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                chunk = picks.sse_event("draft", get.result())
+            else:
+                get.cancel()
+                if disconnect in done:
+                    break
+                chunk = ": keepalive\n\n"
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    finally:
+        picks.broadcaster.unsubscribe(week, callback, path)
+        disconnect.cancel()
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    path = stream_db_path(scope["path"]) if scope["method"] == "GET" else None
+    if path is not None:
+        await draft_stream(scope, receive, send, path)
+    else:
+        await flask_bridge(scope, receive, send)
+
+def raise_fd_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the draft pages from one asyncio process.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("draft_async.py needs uvicorn (pip install uvicorn).")
+    raise_fd_limit()
+    uvicorn.run(application, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# Loaded by gunicorn from the Procfile. Migrations run once, before any
+# worker starts; workers then only check the schema version. They run in a
+# child process so the master never imports app: workers load it fresh, and
+# `kill -HUP` reloads pick up new code.
+import subprocess
+import sys
+
+def on_starting(server):
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "db-migrate"], check=True)
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app reads its settings at import time, so point everything it writes at a
+# scratch directory before any test imports it.
+_scratch = tempfile.mkdtemp(prefix="picks-tests-")
+os.environ.update(DB_PATH=os.path.join(_scratch, "picks.db"), LEAGUES_DIR=os.path.join(_scratch, "leagues"),
+                  BACKUP_DIR=os.path.join(_scratch, "backups"), BACKUP_INTERVAL_SECONDS="0",
+                  PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")  # fast logins
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("EVENT_BUS_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as picks  # noqa: E402
+
+@pytest.fixture
+def db(tmp_path):
+    """A freshly migrated SQLite database with no users, current for the test's duration."""
+    path = str(tmp_path / "test.db")
+    picks.migrate_db(path, default_users=False)
+    with picks.use_db(path):
+        yield path
+
+def login(username, is_admin=False, password="pw12345678"):
+    """A test client signed in as a new user with this name."""
+    picks.set_user(username, password, is_admin=is_admin, must_change=False)
+    client = picks.app.test_client()
+    assert client.post("/", data={"username": username, "password": password}).status_code == 302
+    return client
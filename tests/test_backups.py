@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+
+import pytest
+
+from conftest import login, picks
+
+@pytest.fixture
+def default_db(db, tmp_path, monkeypatch):
+    """The test database standing in for DB_PATH, with backups under tmp_path."""
+    monkeypatch.setattr(picks, "DB_PATH", db)
+    monkeypatch.setattr(picks, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(picks, "list_leagues", lambda: [])
+    return db
+
+def picked_drivers(week):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT driver FROM draft_picks WHERE week=? ORDER BY id", (week,))
+    rows = [r[0] for r in c.fetchall()]; conn.close()
+    return rows
+
+def data_version(name):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT version FROM data_versions WHERE name=?", (name,))
+    v = c.fetchone()[0]; conn.close()
+    return v
+
+def test_admin_download_is_a_checksummed_snapshot(default_db):
+    admin = login("Ann", is_admin=True)
+    picks.create_draft(1, ["Ann"])
+    r = admin.get("/admin_backup?fresh=1")
+    assert r.status_code == 200 and r.mimetype == "application/gzip"
+    assert r.headers["X-Checksum-SHA256"] == hashlib.sha256(r.data).hexdigest()
+    raw = os.path.join(os.path.dirname(default_db), "download.db")
+    with open(raw, "wb") as f:
+        f.write(gzip.decompress(r.data))
+    copy = sqlite3.connect(raw)
+    assert copy.execute("SELECT order_csv FROM drafts WHERE week=1").fetchone() == ("Ann",)
+    copy.close()
+    assert login("Ben").get("/admin_backup").status_code == 403
+
+def test_backup_and_restore_round_trip(default_db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    assert picks.submit_pick(1, "Ann", "Kyle Larson") is None
+    runner = picks.app.test_cli_runner()
+    result = runner.invoke(args=["db-backup"])
+    assert result.exit_code == 0, result.output
+    snapshot = picks.latest_backup(default_db)
+    assert snapshot and picks.backup_checksum(snapshot) == picks.file_sha256(snapshot)
+
+    assert picks.submit_pick(1, "Ben", "Denny Hamlin") is None
+    before = data_version("draft_picks")
+    result = runner.invoke(args=["db-restore", snapshot])
+    assert result.exit_code == 0, result.output
+    assert "Saved the current database first" in result.output
+    assert picked_drivers(1) == ["Kyle Larson"]
+    # Versions only move forward, so caches in running workers reload.
+    assert data_version("draft_picks") > before
+    assert len(picks.list_backups(default_db)) == 2
+
+def test_restore_refuses_a_snapshot_that_fails_its_checksum(default_db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    snapshot = picks.take_backup(default_db)
+    assert picks.submit_pick(1, "Ann", "Kyle Larson") is None
+    with open(snapshot, "r+b") as f:
+        f.seek(-1, os.SEEK_END); last = f.read(1); f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    runner = picks.app.test_cli_runner()
+    result = runner.invoke(args=["db-restore", snapshot])
+    assert result.exit_code != 0 and "checksum mismatch" in result.output
+    os.remove(snapshot + ".sha256")
+    result = runner.invoke(args=["db-restore", snapshot])
+    assert result.exit_code != 0 and "no checksum file" in result.output
+    assert picked_drivers(1) == ["Kyle Larson"]
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from conftest import login, picks
+
+draft_async = pytest.importorskip("draft_async")
+
+@pytest.fixture
+def default_db(db, monkeypatch):
+    # The bridge runs Flask on executor threads, outside the test's use_db().
+    monkeypatch.setattr(picks, "DB_PATH", db)
+    return db
+
+def call(path, query="", method="GET", headers=()):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(), "root_path": "",
+             "headers": [(k.encode(), v.encode()) for k, v in headers], "http_version": "1.1", "scheme": "http",
+             "client": ("127.0.0.1", 1), "server": ("localhost", 80)}
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    asyncio.run(draft_async.application(scope, receive, send))
+    return sent
+
+def test_bridged_export_streams_in_chunks(default_db, monkeypatch):
+    monkeypatch.setattr(picks, "EXPORT_BATCH_ROWS", 10)
+    client = login("Ann")
+    conn = picks.get_conn()
+    conn.executemany("INSERT INTO qualifying (week, position, driver) VALUES (?,?,?)",
+                     [(1, i, f"Driver {i}") for i in range(1, 41)])
+    conn.commit(); conn.close()
+    cookie = client.get_cookie("session").value
+    sent = call("/export/qualifying", "format=csv", headers=[("cookie", f"session={cookie}")])
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 200
+    bodies = [m for m in sent[1:] if m["type"] == "http.response.body"]
+    assert sum(1 for m in bodies if m.get("more_body")) > 1 and not bodies[-1].get("more_body")
+    text = b"".join(m["body"] for m in bodies).decode()
+    assert text.splitlines()[0] == "week,position,driver" and len(text.splitlines()) == 41
+
+def test_bridged_head_on_the_stream_does_not_subscribe(default_db):
+    picks.create_draft(1, ["Ann"])
+    before = picks.broadcaster.viewer_count()
+    sent = call("/draft_stream", "week=1", method="HEAD")
+    assert sent[0]["status"] == 200
+    assert picks.broadcaster.viewer_count() == before
@@ -0,0 +1,49 @@
+import logging
+import time
+
+from conftest import login, picks
+
+def wait_for(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check(): return True
+        time.sleep(0.05)
+    return False
+
+def draft_picks(week):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT round, username, driver, auto FROM draft_picks WHERE week=? ORDER BY id", (week,))
+    rows = c.fetchall(); conn.close()
+    return rows
+
+def test_clock_auto_picks_when_time_runs_out(db):
+    client = login("Ann", is_admin=True)
+    login("Ben")
+    conn = picks.get_conn()
+    conn.execute("INSERT INTO qualifying (week, position, driver) VALUES (1, 1, 'Kyle Larson')"); conn.commit(); conn.close()
+    assert client.post("/admin_order", data={"week": "1", "order": "Ann,Ben", "pick_seconds": "1"}).status_code == 302
+    state = client.get("/draft_state?week=1").get_json()
+    assert state["on_the_clock"] == "Ann" and 0 < state["clock_remaining"] <= 1
+    assert wait_for(lambda: draft_picks(1))
+    assert draft_picks(1)[0] == (1, "Ann", "Kyle Larson", picks.PICK_CLOCK)
+    state = client.get("/draft_state?week=1").get_json()
+    assert state["on_the_clock"] == "Ben" and state["clock_remaining"] is not None
+
+def test_clock_keeps_running_when_a_rescan_fails(db, monkeypatch):
+    picks.create_draft(1, ["Ann", "Ben"])
+    def broken():
+        raise OSError("leagues directory unreadable")
+    monkeypatch.setattr(picks, "list_leagues", broken)
+    clock = picks.DraftClock()
+    clock.start()
+    clock.schedule(db, 1, 1, 0, time.time())
+    assert wait_for(lambda: draft_picks(1))
+    assert clock.thread.is_alive()
+
+def test_stalled_auto_pick_is_logged(db, caplog):
+    picks.create_draft(1, ["Ann", "Ben"])
+    conn = picks.get_conn(); conn.execute("DELETE FROM drivers"); conn.commit(); conn.close()
+    with caplog.at_level(logging.WARNING):
+        picks.DraftClock()._auto_pick(db, 1, 1, 0)
+    assert "Auto-pick stalled for week 1" in caplog.text and "No drivers left" in caplog.text
+    assert draft_picks(1) == []
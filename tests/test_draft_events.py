@@ -0,0 +1,108 @@
+import pytest
+
+from conftest import picks
+
+ORDER = ["Ann", "Ben", "Cal", "Dee"]
+
+def pick_next(week):
+    d = picks.get_draft(week)
+    username = picks.on_the_clock_for(d)
+    driver = f"Driver {len(picks.draft_events(week, limit=1000))}"
+    assert picks.submit_pick(week, username, driver, custom=True) is None
+    return username
+
+def replay_matches(week):
+    conn = picks.get_conn(); c = conn.cursor()
+    try:
+        return picks.replay_draft(c, week)[1] == picks.draft_projection(c, week)
+    finally:
+        conn.close()
+
+def rounds_by_user(week):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT username, round FROM draft_picks WHERE week=? ORDER BY id", (week,))
+    rows = c.fetchall(); conn.close()
+    by_user = {}
+    for username, round_no in rows:
+        by_user.setdefault(username, []).append(round_no)
+    return by_user
+
+def test_replay_matches_the_projection_across_snapshots(db, monkeypatch):
+    monkeypatch.setattr(picks, "DRAFT_SNAPSHOT_EVERY", 3)
+    picks.create_draft(1, ORDER)
+    for _ in range(7):
+        pick_next(1)
+    assert picks.submit_pick(1, None, None, auto=True) is None
+    picks.undo_last_pick(1)
+    picks.undo_last_pick(1)
+    pick_next(1)
+    assert replay_matches(1)
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM draft_snapshots WHERE week=1")
+    assert c.fetchone()[0] > 1
+    conn.close()
+
+def test_replay_of_a_reset_week_is_empty(db):
+    picks.create_draft(2, ORDER)
+    pick_next(2)
+    conn = picks.get_conn(); c = conn.cursor()
+    v = picks.next_draft_version(c)
+    c.execute("DELETE FROM draft_picks WHERE week=2"); c.execute("DELETE FROM drafts WHERE week=2")
+    picks.log_draft_event(c, 2, v, "reset")
+    conn.commit()
+    assert picks.replay_draft(c, 2)[1] is None and picks.draft_projection(c, 2) is None
+    conn.close()
+
+def test_undo_puts_the_player_back_on_the_clock(db):
+    picks.create_draft(1, ORDER)
+    for _ in range(5):
+        last = pick_next(1)
+    assert picks.undo_last_pick(1)[1] == last
+    assert picks.on_the_clock_for(picks.get_draft(1)) == last
+    assert replay_matches(1)
+
+def test_reorder_mid_round_is_refused(db):
+    picks.create_draft(1, ORDER)
+    pick_next(1)
+    assert "under way" in picks.reorder_draft(1, ["Ben", "Ann", "Cal", "Dee"])
+    assert picks.get_draft(1)["order"] == ORDER
+
+def test_reorder_between_rounds_keeps_one_pick_per_round(db):
+    picks.create_draft(1, ORDER)
+    for _ in ORDER:
+        pick_next(1)
+    assert picks.reorder_draft(1, ["Ben", "Ann", "Dee", "Cal"]) is None
+    while picks.get_draft(1)["status"] != "complete":
+        pick_next(1)
+    assert rounds_by_user(1) == {u: list(range(1, picks.ROUNDS_TOTAL + 1)) for u in ORDER}
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT username FROM picks WHERE week=1 ORDER BY username")
+    assert [r[0] for r in c.fetchall()] == sorted(ORDER)
+    conn.close()
+    assert replay_matches(1)
+
+def test_undo_stops_at_a_reorder_that_moved_the_last_picker(db):
+    picks.create_draft(1, ORDER)
+    for _ in ORDER:
+        pick_next(1)
+    assert picks.reorder_draft(1, ["Dee", "Cal", "Ben", "Ann"]) is None
+    with pytest.raises(ValueError, match="reordered"):
+        picks.undo_last_pick(1)
+    assert replay_matches(1)
+
+def test_draft_replay_command_fixes_a_league():
+    picks.create_league("replay")
+    with picks.use_db(picks.league_db_path("replay")):
+        picks.create_draft(1, ORDER)
+        pick_next(1)
+        conn = picks.get_conn()
+        conn.execute("DELETE FROM draft_picks WHERE week=1"); conn.commit(); conn.close()
+        assert not replay_matches(1)
+    runner = picks.app.test_cli_runner()
+    result = runner.invoke(args=["draft-replay", "--league", "replay"])
+    assert "Week 1: differs" in result.output
+    result = runner.invoke(args=["draft-replay", "--league", "replay", "--fix"])
+    assert "Week 1: rewritten" in result.output
+    with picks.use_db(picks.league_db_path("replay")):
+        assert replay_matches(1)
+    assert runner.invoke(args=["draft-replay", "--league", "missing"]).exit_code != 0
@@ -0,0 +1,60 @@
+from conftest import picks
+
+def state(client, **args):
+    r = client.get("/draft_state", query_string=dict(week=1, compact=1, **args))
+    assert r.status_code == 200
+    return r.get_json()
+
+def test_full_compact_payload_numbers_drivers(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    assert picks.submit_pick(1, "Ann", "Kyle Larson") is None
+    s = state(picks.app.test_client())
+    assert s["compact"] is True and s["delta"] is False and s["order"] == ["Ann", "Ben"]
+    names = s["drivers"]
+    assert names == sorted(names, key=picks.last_name_key)
+    assert len(s["grid"]) == s["rounds_total"] and s["grid"][0] == [names.index("Kyle Larson"), -1]
+
+def test_delta_since_a_version_lists_only_new_cells(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    first = state(client)
+    assert picks.submit_pick(1, "Ann", "Kyle Larson") is None
+    assert picks.submit_pick(1, "Ben", "Denny Hamlin") is None
+    s = state(client, since=first["version"], dict=first["dict"])
+    assert s["delta"] is True and "drivers" not in s and "grid" not in s
+    names = first["drivers"]
+    assert s["cells"] == [[1, 0, names.index("Kyle Larson")], [1, 1, names.index("Denny Hamlin")]]
+    assert state(client, since=s["version"], dict=s["dict"])["cells"] == []
+
+def test_unchanged_draft_answers_304(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    s = state(client)
+    r = client.get("/draft_state", query_string={"week": 1, "compact": 1},
+                   headers={"If-None-Match": f'"c1-{s["version"]}"'})
+    assert r.status_code == 304
+    # The compact and full payloads don't share a validator.
+    r = client.get("/draft_state", query_string={"week": 1}, headers={"If-None-Match": f'"c1-{s["version"]}"'})
+    assert r.status_code == 200
+
+def test_custom_driver_sends_the_dictionary_again(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    first = state(client)
+    assert picks.submit_pick(1, "Ann", "Zed Nobody", custom=True) is None
+    s = state(client, since=first["version"], dict=first["dict"])
+    assert s["dict"] != first["dict"] and s["delta"] is False
+    assert "Zed Nobody" in s["drivers"] and s["grid"][0][0] == s["drivers"].index("Zed Nobody")
+    assert state(client, since=s["version"], dict=s["dict"])["delta"] is True
+
+def test_undo_forces_a_full_reload(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    assert picks.submit_pick(1, "Ann", "Kyle Larson") is None
+    before = state(client)
+    picks.undo_last_pick(1)
+    s = state(client, since=before["version"], dict=before["dict"])
+    assert s["delta"] is False and s["grid"][0] == [-1, -1]
+    # Even with the current dictionary, a version from before the undo is stale.
+    assert state(client, since=before["version"], dict=s["dict"])["delta"] is False
+    assert state(client, since=s["version"], dict=s["dict"])["delta"] is True
@@ -0,0 +1,32 @@
+from conftest import picks
+
+def test_head_does_not_subscribe(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    before = picks.broadcaster.viewer_count()
+    for _ in range(6):
+        r = client.head("/draft_stream?week=1")
+        assert r.status_code == 200 and r.mimetype == "text/event-stream"
+    assert picks.broadcaster.viewer_count() == before
+
+def test_unread_stream_unsubscribes_on_close(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    before = picks.broadcaster.viewer_count()
+    r = client.get("/draft_stream?week=1", buffered=False)
+    assert picks.broadcaster.viewer_count() == before + 1
+    r.close()
+    assert picks.broadcaster.viewer_count() == before
+
+def test_streams_past_the_cap_get_503(db, monkeypatch):
+    monkeypatch.setattr(picks, "stream_slots", picks.threading.BoundedSemaphore(2))
+    picks.create_draft(1, ["Ann", "Ben"])
+    client = picks.app.test_client()
+    held = [client.get("/draft_stream?week=1", buffered=False) for _ in range(2)]
+    assert [r.status_code for r in held] == [200, 200]
+    assert client.get("/draft_stream?week=1").status_code == 503
+    held[0].close()
+    again = client.get("/draft_stream?week=1", buffered=False)
+    assert again.status_code == 200
+    for r in held[1:] + [again]:
+        r.close()
@@ -0,0 +1,102 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from conftest import picks
+
+def wait_for(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check(): return True
+        time.sleep(0.02)
+    return False
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(params=["unix", "tcp"])
+def hub_url(request, tmp_path):
+    url = f"unix://{tmp_path}/bus.sock" if request.param == "unix" else f"tcp://127.0.0.1:{free_port()}"
+    hub = picks.EventHub(url)
+    threading.Thread(target=hub.serve_forever, daemon=True).start()
+    yield url
+    hub.close()
+
+def connected_bus(url):
+    bus = picks.SocketEventBus(url)
+    seen = []
+    bus.subscribe(seen.append)
+    bus.start()
+    assert wait_for(lambda: bus.sock is not None)
+    return bus, seen
+
+def test_bus_address():
+    assert picks.bus_address("unix:///tmp/x.sock") == (socket.AF_UNIX, "/tmp/x.sock")
+    assert picks.bus_address("tcp://10.0.0.1:7000") == (socket.AF_INET, ("10.0.0.1", 7000))
+    for bad in ["tcp://host", "tcp://:7000", "http://host:1", ""]:
+        with pytest.raises(ValueError):
+            picks.bus_address(bad)
+
+def test_hub_relays_to_every_other_bus(hub_url):
+    a, seen_a = connected_bus(hub_url)
+    b, seen_b = connected_bus(hub_url)
+    c, seen_c = connected_bus(hub_url)
+    event = {"league": "east", "week": 3}
+    a.publish(event)
+    assert wait_for(lambda: seen_b and seen_c)
+    time.sleep(0.2)  # the hub must not echo it back to the sender
+    assert seen_a == [event] and seen_b == [event] and seen_c == [event]
+
+def test_hub_skips_lines_that_are_not_json(hub_url):
+    a, _ = connected_bus(hub_url)
+    b, seen_b = connected_bus(hub_url)
+    with a.lock: a.sock.sendall(b"not json\n")
+    a.publish({"league": None, "week": 1})
+    assert wait_for(lambda: seen_b)
+    assert seen_b == [{"league": None, "week": 1}]
+
+def test_bus_reconnects_after_the_hub_restarts(tmp_path):
+    url = f"unix://{tmp_path}/bus.sock"
+    hub = picks.EventHub(url)
+    threading.Thread(target=hub.serve_forever, daemon=True).start()
+    a, _ = connected_bus(url)
+    hub.close()
+    assert wait_for(lambda: a.sock is None)
+    hub = picks.EventHub(url)
+    threading.Thread(target=hub.serve_forever, daemon=True).start()
+    try:
+        b, seen_b = connected_bus(url)
+        assert wait_for(lambda: a.sock is not None)
+        a.publish({"league": None, "week": 2})
+        assert wait_for(lambda: seen_b == [{"league": None, "week": 2}])
+    finally:
+        hub.close()
+
+def test_bus_without_a_hub_still_delivers_locally(tmp_path):
+    bus = picks.SocketEventBus(f"unix://{tmp_path}/missing.sock")
+    seen = []
+    bus.subscribe(seen.append)
+    bus.publish({"league": None, "week": 5})
+    assert seen == [{"league": None, "week": 5}]
+
+def test_hub_drops_a_client_whose_queue_is_full(tmp_path):
+    url = f"unix://{tmp_path}/bus.sock"
+    hub = picks.EventHub(url, queue_size=1)
+    threading.Thread(target=hub.serve_forever, daemon=True).start()
+    try:
+        stuck = socket.socket(socket.AF_UNIX)
+        stuck.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+        stuck.connect(f"{tmp_path}/bus.sock")
+        a, _ = connected_bus(url)
+        assert wait_for(lambda: len(hub.clients) == 2)
+        for week in range(20000):
+            a.publish({"league": None, "week": week})
+            if len(hub.clients) == 1: break
+        assert wait_for(lambda: len(hub.clients) == 1)
+        stuck.close()
+    finally:
+        hub.close()
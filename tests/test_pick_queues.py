@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import login, picks
+
+def draft_picks(week):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT round, username, driver, auto FROM draft_picks WHERE week=? ORDER BY id", (week,))
+    rows = c.fetchall(); conn.close()
+    return rows
+
+@pytest.fixture
+def players(db):
+    clients = {u: login(u) for u in ["Ann", "Ben", "Cal"]}
+    picks.create_draft(1, ["Ann", "Ben", "Cal"])
+    return clients
+
+def test_one_pick_chains_through_every_queued_player(players):
+    assert players["Ben"].post("/draft_queue?week=1", data={"queue": "Denny Hamlin\nChase Elliott"}).status_code == 302
+    assert players["Cal"].post("/draft_queue?week=1", data={"queue": "Kyle Larson\nRyan Blaney\nJoey Logano"}).status_code == 302
+    assert draft_picks(1) == []  # Ann is on the clock and has no queue
+    assert players["Ann"].post("/draft?week=1", data={"driver": "Kyle Larson"}).status_code == 302
+    # Cal's first choice went to Ann, so Cal drafts the next one; the snake
+    # then gives Cal and Ben another queued pick each before Ann is up again.
+    assert draft_picks(1) == [
+        (1, "Ann", "Kyle Larson", picks.PICK_MANUAL),
+        (1, "Ben", "Denny Hamlin", picks.PICK_QUEUE),
+        (1, "Cal", "Ryan Blaney", picks.PICK_QUEUE),
+        (2, "Cal", "Joey Logano", picks.PICK_QUEUE),
+        (2, "Ben", "Chase Elliott", picks.PICK_QUEUE),
+    ]
+    state = players["Ann"].get("/draft_state?week=1").get_json()
+    assert state["on_the_clock"] == "Ann" and state["current_round"] == 2 and state["current_index"] == 2
+
+def test_queued_picks_commit_with_the_pick_that_triggered_them(players, monkeypatch):
+    players["Ben"].post("/draft_queue?week=1", data={"queue": "Denny Hamlin"})
+    players["Cal"].post("/draft_queue?week=1", data={"queue": "Ryan Blaney"})
+    real = picks.record_pick
+    def fail_on_cal(c, d, username, driver, how=picks.PICK_MANUAL):
+        if username == "Cal": raise picks.sqlite3.OperationalError("disk I/O error")
+        return real(c, d, username, driver, how)
+    monkeypatch.setattr(picks, "record_pick", fail_on_cal)
+    with pytest.raises(picks.sqlite3.OperationalError):
+        picks.submit_pick(1, "Ann", "Kyle Larson")
+    assert draft_picks(1) == []
+    assert picks.get_draft(1)["current_index"] == 0
+
+def test_unknown_queued_driver_is_rejected(players):
+    r = players["Ben"].post("/draft_queue?week=1", data={"queue": "Nobody Atall"})
+    assert r.status_code == 400 and b"Unknown driver" in r.data
+    assert picks.get_pick_queue(1, "Ben") == []
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from conftest import login, picks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def default_db(db, monkeypatch):
+    """The test database standing in for DB_PATH, where unprefixed sessions live."""
+    monkeypatch.setattr(picks, "DB_PATH", db)
+    return db
+
+def revoke_elsewhere(db, username):
+    # Another worker process signs the user out.
+    code = f"import app; app.revoke_sessions({username!r}, path={db!r})"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=dict(os.environ, DB_PATH=db), check=True)
+
+def stored_hash(username):
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT password_hash FROM users WHERE username=?", (username,))
+    h = c.fetchone()[0]; conn.close()
+    return h
+
+def signed_in(client):
+    return client.get("/change_password").status_code == 200
+
+def test_session_revoked_in_another_process_ends_within_the_cache_time(default_db, monkeypatch):
+    monkeypatch.setattr(picks, "USER_CACHE_SECONDS", 0)
+    ann = login("Ann")
+    assert signed_in(ann)
+    revoke_elsewhere(default_db, "Ann")
+    assert not signed_in(ann)
+
+def test_cached_session_revoked_elsewhere_is_not_written_back(default_db):
+    ann = login("Ann")
+    assert signed_in(ann)
+    revoke_elsewhere(default_db, "Ann")
+    r = ann.get("/post_login")  # changes the session, so this worker saves it
+    assert "session=;" in r.headers.get("Set-Cookie", "")
+    assert not signed_in(ann)
+    conn = picks.get_conn(); c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM sessions WHERE username='Ann'")
+    assert c.fetchone()[0] == 0
+    conn.close()
+
+def test_password_change_signs_out_other_sessions(default_db):
+    phone = login("Ann")
+    laptop = picks.app.test_client()
+    laptop.post("/", data={"username": "Ann", "password": "pw12345678"})
+    r = laptop.post("/change_password", data={"current": "pw12345678", "new1": "newpass123", "new2": "newpass123"})
+    assert r.status_code == 302
+    assert signed_in(laptop) and not signed_in(phone)
+
+def test_made_up_cookies_and_usernames_are_not_cached(db):
+    client = picks.app.test_client()
+    sessions, users = len(picks._session_cache), len(picks._user_cache)
+    for i in range(20):
+        client.set_cookie("session", f"forged{i}")
+        client.get("/lobby")
+        client.post("/", data={"username": f"nobody{i}", "password": "x"})
+    assert len(picks._session_cache) == sessions and len(picks._user_cache) == users
+
+def test_auth_cache_keeps_only_the_most_recent_entries(monkeypatch):
+    monkeypatch.setattr(picks, "USER_CACHE_SIZE", 3)
+    cache = picks.OrderedDict()
+    for i in range(5):
+        picks.cache_put(cache, i, {"n": i})
+    picks.cache_get(cache, 2)
+    picks.cache_put(cache, 5, {"n": 5})
+    assert list(cache) == [4, 2, 5]
+
+def test_login_rehashes_only_to_a_stronger_method(db, monkeypatch):
+    login("Ann")
+    assert stored_hash("Ann").startswith("pbkdf2:sha256:1000$")
+    monkeypatch.setattr(picks, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:2000")
+    login_again = picks.app.test_client().post("/", data={"username": "Ann", "password": "pw12345678"})
+    assert login_again.status_code == 302 and stored_hash("Ann").startswith("pbkdf2:sha256:2000$")
+    # A weaker setting, or a prefix of the stored cost, never rehashes down.
+    monkeypatch.setattr(picks, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:200")
+    picks.app.test_client().post("/", data={"username": "Ann", "password": "pw12345678"})
+    assert stored_hash("Ann").startswith("pbkdf2:sha256:2000$")
+
+def test_login_keeps_a_scrypt_hash_under_a_pbkdf2_setting(db):
+    login("Ben")
+    strong = generate_password_hash("pw12345678", method="scrypt:1024:8:1")
+    conn = picks.get_conn(); conn.execute("UPDATE users SET password_hash=? WHERE username='Ben'", (strong,)); conn.commit(); conn.close()
+    picks.forget_user("Ben")
+    assert picks.app.test_client().post("/", data={"username": "Ben", "password": "pw12345678"}).status_code == 302
+    assert stored_hash("Ben") == strong
+
+def test_needs_rehash_compares_algorithm_and_cost(monkeypatch):
+    for method, stored, expected in [
+        ("pbkdf2:sha256:60000", "pbkdf2:sha256:600000$s$h", False),
+        ("pbkdf2:sha256:600000", "pbkdf2:sha256:60000$s$h", True),
+        ("pbkdf2:sha256", "scrypt:32768:8:1$s$h", False),
+        ("scrypt", "pbkdf2:sha256:600000$s$h", True),
+        ("scrypt:65536:8:1", "scrypt:32768:8:1$s$h", True),
+        ("pbkdf2:sha512:600000", "pbkdf2:sha256:600000$s$h", True),
+        ("pbkdf2:sha256:600000", "pbkdf2:sha256:600000$s$h", False),
+    ]:
+        monkeypatch.setattr(picks, "PASSWORD_HASH_METHOD", method)
+        assert picks.needs_rehash(stored) is expected, (method, stored)
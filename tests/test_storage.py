@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+from conftest import picks
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = 1
+        self.description = None
+        self.rows = [(1,), (2,)]
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def executemany(self, sql, seq):
+        self.log.append((sql, list(seq)))
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+class FakeRaw:
+    def __init__(self):
+        self.log = []
+        self.closed = False
+        self.names = []
+
+    def cursor(self, name=None):
+        self.names.append(name)
+        return FakeCursor(self.log)
+
+    def close(self):
+        self.closed = True
+
+class FakePool:
+    def __init__(self):
+        self.released = []
+
+    def release(self, conn):
+        self.released.append(conn)
+
+def test_pg_sql_translates_placeholders_and_escapes_percent():
+    assert picks.pg_sql("SELECT * FROM t WHERE a=? AND b=?") == "SELECT * FROM t WHERE a=%s AND b=%s"
+    assert picks.pg_sql("SELECT name FROM t WHERE name LIKE 'a%' AND x=?") == "SELECT name FROM t WHERE name LIKE 'a%%' AND x=%s"
+
+def test_pg_cursor_only_translates_statements_with_parameters():
+    raw = FakeRaw()
+    c = picks.PgConnection(raw, "league").cursor()
+    c.execute("SELECT 1 WHERE 'a%' LIKE 'a%'")
+    c.execute("SELECT ? WHERE 'a%' LIKE ?", (1, "a%"))
+    c.executemany("INSERT INTO t VALUES (?, ?)", [(1, 2), (3, 4)])
+    assert raw.log == [
+        ("SELECT 1 WHERE 'a%' LIKE 'a%'", None),
+        ("SELECT %s WHERE 'a%%' LIKE %s", (1, "a%")),
+        ("INSERT INTO t VALUES (%s, %s)", [(1, 2), (3, 4)]),
+    ]
+    assert c.fetchone() == (1,) and list(c) == [(1,), (2,)] and c.rowcount == 1
+
+def test_pg_stream_cursor_is_server_side():
+    raw = FakeRaw()
+    conn = picks.PgConnection(raw, "league")
+    conn.cursor(); conn.stream_cursor(); conn.stream_cursor()
+    assert raw.names[0] is None
+    assert all(n.startswith("stream_") for n in raw.names[1:]) and raw.names[1] != raw.names[2]
+
+def test_pg_connection_close_returns_it_to_its_pool():
+    raw = FakeRaw()
+    conn = picks.PgConnection(raw, "league_east")
+    conn.pool = pool = FakePool()
+    conn.close()
+    assert pool.released == [conn] and not raw.closed
+    conn.pool = None
+    conn.close()
+    assert raw.closed
+
+def test_pg_errors_raise_sqlite_exception_types():
+    psycopg = pytest.importorskip("psycopg")
+    with pytest.raises(sqlite3.IntegrityError):
+        with picks.pg_errors(): raise psycopg.IntegrityError("duplicate key")
+    with pytest.raises(sqlite3.OperationalError):
+        with picks.pg_errors(): raise psycopg.OperationalError("connection lost")
+
+def test_postgres_schema_names():
+    pytest.importorskip("psycopg")
+    pg = picks.PostgresStorage("postgresql://unused")
+    assert pg.schema(picks.DB_PATH) == "league"
+    assert pg.schema(picks.league_db_path("east")) == "league_east"
+
+def test_record_pick_is_a_compare_and_swap(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    conn = picks.get_conn(); c = conn.cursor()
+    first = picks.load_draft_for_update(c, 1)
+    stale = picks.load_draft_for_update(c, 1)
+    assert picks.record_pick(c, first, "Ann", "Kyle Larson")
+    assert not picks.record_pick(c, stale, "Ann", "Denny Hamlin")
+    conn.commit()
+    c.execute("SELECT username, driver FROM draft_picks WHERE week=1")
+    assert c.fetchall() == [("Ann", "Kyle Larson")]
+    conn.close()
+
+def test_submit_pick_rejects_a_slot_already_taken(db):
+    picks.create_draft(1, ["Ann", "Ben"])
+    assert picks.submit_pick(1, "Ann", "Kyle Larson", custom=True, expect=(1, 0)) is None
+    assert picks.submit_pick(1, "Ann", "Denny Hamlin", custom=True, expect=(1, 0)) == ("That pick has already been made.", 409)
+    assert picks.submit_pick(1, "Ann", "Denny Hamlin", custom=True) == ("Not your turn.", 403)
+    assert picks.submit_pick(1, "Ben", "Kyle Larson", custom=True) == ("Driver not available.", 400)